@@ -0,0 +1,587 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import os
+import sys
+import time
+import io
+import re
+import json
+import types
+import pickle
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+# Import custom scripts
+import job as job_module
+import synthtree
+import jobexecutor
+import globaljobs
+import globaljobsparallel
+import statuscache
+import getstatuses as get_stat
+import hdf5reader
+import hdf5aggregate
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Micro-benchmarks for the pieces of the status pipeline that get slow on big trees
+#
+# Usage:
+#   python benchmark.py tail [--size-mb 2048] [--file some.o123456]
+#   python benchmark.py sweep [--root DIR | --subfolders 8 --runs 50] [--executors thread process asyncio]
+#                             [--workers 1 4 16] [--chunk-sizes 1 16 64] [--json results.json]
+#   python benchmark.py e2e [--root DIR | --subfolders 8 --runs 50 --output-mb 1 --timestep-mb 2 --hdf5]
+#                           [--json results.json]
+#   python benchmark.py table [--jobs 10000] [--folders 100]
+#   python benchmark.py ipc [--root DIR | --subfolders 8 --runs 50]
+#   python benchmark.py statuses [--jobs 50000] [--folders 100]
+#   python benchmark.py html [--jobs 2000] [--folders 20]
+#   python benchmark.py aggregate [--root DIR | --subfolders 2 --runs 20 --hdf5-rows 200000] [--workers 4]
+
+# The byte-at-a-time tail reader that job.get_last_n_lines used to use, kept here so we can compare against it
+#
+# METHOD BORROWED FROM https://thispointer.com/python-get-last-n-lines-of-a-text-file-like-tail-command/
+def bytewise_last_n_lines(file_name, N):
+    list_of_lines = []
+    with open(file_name, 'rb') as read_obj:
+        read_obj.seek(0, os.SEEK_END)
+        buffer = bytearray()
+        pointer_location = read_obj.tell()
+        while pointer_location >= 0:
+            read_obj.seek(pointer_location)
+            pointer_location = pointer_location -1
+            new_byte = read_obj.read(1)
+            if new_byte == b'\n':
+                list_of_lines.append(buffer.decode()[::-1])
+                if len(list_of_lines) == N:
+                    return list(reversed(list_of_lines))
+                buffer = bytearray()
+            else:
+                buffer.extend(new_byte)
+        if len(buffer) > 0:
+            list_of_lines.append(buffer.decode()[::-1])
+    return list(reversed(list_of_lines))
+
+# Write a fake Velodyne output log of roughly size_mb megabytes
+#
+# The bulk is written in big repeated blocks so generating a multi-GB file doesn't take forever,
+# and it ends with a realistic completion tail
+def write_fake_log(file_name, size_mb):
+    line = b" cycle      123456   time  1.234567e-03   dt  1.000000e-08   energy  9.876543e+02\n"
+    block = line * (1024 * 1024 // len(line))
+    with open(file_name, 'wb') as f:
+        for i in range(size_mb):
+            f.write(block)
+        f.write(b" Normal termination\n")
+        f.write(b" Total Computation Time: 1.234e+05\n")
+
+# Time how long it takes to call method(file_name, N) repeat times
+#
+# @return the best time for a single call, in seconds
+def time_call(method, file_name, N, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        method(file_name, N)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+# Compare the block-based tail reader against the old byte-at-a-time one
+#
+# The old reader returns an extra empty line for a file ending in a newline, so we ask it for one more
+# line and drop that before checking they agree
+def run_tail(args):
+    cleanup = None
+    file_name = args.file
+    if file_name is None:
+        directory = tempfile.mkdtemp(dir=args.tmpdir)
+        file_name = os.path.join(directory, "fake.o123456")
+        print("Writing a " + str(args.size_mb) + " MB fake log to " + file_name + "...")
+        write_fake_log(file_name, args.size_mb)
+        cleanup = directory
+
+    try:
+        print("File size: " + "{:.1f}".format(os.path.getsize(file_name) / 1024 / 1024) + " MB")
+        print()
+        print("{:>6}  {:>14}  {:>14}  {:>8}".format("lines", "bytewise (ms)", "blocks (ms)", "speedup"))
+        for N in args.lines:
+            old = bytewise_last_n_lines(file_name, N + 1)
+            if len(old) > 0 and old[-1] == "":
+                old = old[:-1]
+            new = job_module.tail_lines(file_name, N)
+            if [line.rstrip("\r") for line in old[-N:]] != new:
+                print("WARNING: readers disagree on the last " + str(N) + " lines")
+            old_time = time_call(bytewise_last_n_lines, file_name, N + 1, args.repeat)
+            new_time = time_call(job_module.tail_lines, file_name, N, args.repeat)
+            print("{:>6}  {:>14.3f}  {:>14.3f}  {:>7.1f}x".format(N, old_time * 1000, new_time * 1000, old_time / new_time))
+    finally:
+        if cleanup is not None:
+            os.remove(file_name)
+            os.rmdir(cleanup)
+
+# Time a full scan of the tree (no status cache, so every job gets parsed) for every combination of executor
+# kind, worker count and chunk size
+#
+# Each combination gets its own job_executor, warmed up with one untimed scan the same way watch mode keeps
+# its pool between refreshes, and then we take the best of --repeat scans
+def run_sweep(args):
+    root = args.root
+    if root is None:
+        root = tempfile.mkdtemp(dir=args.tmpdir)
+        print("Writing " + str(args.subfolders * args.runs) + " fake runs to " + root + "...")
+        synthtree.make_tree(root, args.subfolders, args.runs, args.output_mb, args.timestep_mb)
+
+    results = list()
+    try:
+        print()
+        print("{:>8}  {:>8}  {:>6}  {:>10}  {:>10}".format("executor", "workers", "chunk", "best (s)", "jobs/s"))
+        for kind in args.executors:
+            for workers in args.workers:
+                for chunk_size in args.chunk_sizes:
+                    with jobexecutor.job_executor(kind, workers, chunk_size) as executor:
+                        best = None
+                        num_jobs = 0
+                        for i in range(args.repeat + 1):
+                            with contextlib.redirect_stdout(io.StringIO()):
+                                start = time.perf_counter()
+                                jobs = globaljobsparallel.return_all_jobs(root, True, None, executor)
+                                elapsed = time.perf_counter() - start
+                            num_jobs = sum(len(subfolder_jobs) for subfolder_jobs in jobs)
+                            if i > 0 and (best is None or elapsed < best):
+                                best = elapsed
+                    print("{:>8}  {:>8}  {:>6}  {:>10.3f}  {:>10.1f}".format(kind, workers, chunk_size, best, num_jobs / best))
+                    results.append({"executor": kind, "workers": workers, "chunk_size": chunk_size,
+                                    "jobs": num_jobs, "seconds": best})
+    finally:
+        if args.root is None:
+            shutil.rmtree(root)
+
+    fastest = min(results, key=lambda result: result["seconds"])
+    print()
+    print("Fastest: --executor " + fastest["executor"] + " --workers " + str(fastest["workers"]) +
+          " --chunk-size " + str(fastest["chunk_size"]))
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+# Call method() repeat times with its printing switched off
+#
+# @return (best time for a single call in seconds, what the last call returned)
+def time_quietly(method, repeat):
+    best = None
+    result = None
+    for i in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = method()
+            elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+# Jobs only read their files when something asks for their timing_data, which the parallel scan's workers
+# do for every job (see jobexecutor.build_chunk()) but the sequential scan leaves for get_statuses. Ask here,
+# so both scan stages time the same work.
+#
+# @return job_lists
+def parsed_jobs(job_lists):
+    for job_list in job_lists:
+        for found in job_list:
+            found.timing_data
+    return job_lists
+
+# Time each stage of a globalstatus.py run on its own, so regressions can be pinned on one of them:
+#
+# 1) globaljobs:                 the sequential scan
+# 2) globaljobsparallel:         the parallel scan, with no status cache
+# 3) globaljobsparallel_cached:  the parallel scan again with a warm status cache (what a cron refresh costs)
+# 4) get_statuses:               formatting the job lists into the status table
+# 5) print_to_HTML:              writing the pages (into a temp folder, not the real HOME_LOCATION)
+#
+# The results are printed and, with --json, written out so runs can be compared over time
+def run_e2e(args):
+    root = args.root
+    scratch = tempfile.mkdtemp(dir=args.tmpdir)
+    tree = {"root": root}
+    try:
+        if root is None:
+            root = os.path.join(scratch, "tree")
+            print("Writing " + str(args.subfolders * args.runs) + " fake runs to " + root + "...")
+            synthtree.make_tree(root, args.subfolders, args.runs, args.output_mb, args.timestep_mb,
+                                resubmissions=args.resubmissions, hdf5_rows=args.hdf5_rows if args.hdf5 else 0)
+            tree = {"subfolders": args.subfolders, "runs": args.runs, "output_mb": args.output_mb,
+                    "timestep_mb": args.timestep_mb, "resubmissions": args.resubmissions, "hdf5": args.hdf5}
+
+        timings = dict()
+        timings["globaljobs"], job_lists = time_quietly(lambda: parsed_jobs(globaljobs.return_all_jobs(root, True)),
+                                                        args.repeat)
+        with jobexecutor.job_executor(args.executor, args.workers, args.chunk_size) as executor:
+            timings["globaljobsparallel"], job_lists = time_quietly(
+                lambda: globaljobsparallel.return_all_jobs(root, True, None, executor), args.repeat)
+            cache = statuscache.status_cache(os.path.join(scratch, "status_cache.pkl"), rebuild=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                globaljobsparallel.return_all_jobs(root, True, cache, executor)
+            timings["globaljobsparallel_cached"], job_lists = time_quietly(
+                lambda: globaljobsparallel.return_all_jobs(root, True, cache, executor), args.repeat)
+            pool = {"kind": executor.kind, "workers": executor.workers, "chunk_size": executor.chunk_size}
+
+        timings["get_statuses"], statuses = time_quietly(lambda: get_stat.get_all_statuses(job_lists), args.repeat)
+
+        home_location = os.path.join(scratch, "Home1.html")
+        about_location = os.path.join(scratch, "About1.html")
+        open(home_location, 'w').close()
+        timings["print_to_HTML"], result = time_quietly(
+            lambda: get_stat.print_to_HTML(statuses, time.time(), home_location, about_location, force=True), args.repeat)
+
+        num_jobs = sum(len(job_list) for job_list in job_lists)
+        results = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "python": sys.version.split()[0],
+                   "tree": tree,
+                   "jobs": num_jobs,
+                   "executor": pool,
+                   "repeat": args.repeat,
+                   "seconds": timings,
+                   "html_bytes": os.path.getsize(home_location)}
+    finally:
+        shutil.rmtree(scratch)
+
+    print()
+    print("{:>26}  {:>10}".format("stage (" + str(num_jobs) + " jobs)", "best (s)"))
+    for stage, seconds in timings.items():
+        print("{:>26}  {:>10.3f}".format(stage, seconds))
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print()
+        print("Results written to " + args.json)
+
+# Make count fake jobs (just a timing_data status_record each, no files behind them) split over folders job lists
+#
+# @return a list of job lists, like globaljobs.return_all_jobs() gives you
+def fake_job_lists(count, folders, seed=0):
+    rng = random.Random(seed)
+    states = [job_module.RUNNING_STATE] + job_module.get_terminal_states()
+    job_lists = [list() for i in range(folders)]
+    for i in range(count):
+        state = rng.choice(states)
+        start = datetime(2023, 1, 1) + timedelta(seconds=rng.randint(0, 10**6))
+        elapsed = timedelta(seconds=rng.randint(60, 10**6))
+        percent = 100.0 if state == "COMPLETE" else rng.uniform(0.1, 99.9)
+        remaining = elapsed * (100 - percent) / percent if state == job_module.RUNNING_STATE else None
+        end = start + elapsed + (remaining if remaining is not None else timedelta(0))
+        record = job_module.status_record(str(100000 + i), "unit_cell_" + str(i), percent, start, elapsed, remaining,
+                                          end, state)
+        job_lists[i % folders].append(types.SimpleNamespace(timing_data=record))
+    return job_lists
+
+# How the status table used to be put together: a one-row DataFrame per job (built in job.get_timing_data()),
+# concatenated once per folder in get_statuses() and then again in globalstatus.py
+def dataframe_per_job(job_lists):
+    statuses = list()
+    for job_list in job_lists:
+        frames = list()
+        for fake_job in job_list:
+            row = list(fake_job.timing_data)
+            if row[7] != job_module.RUNNING_STATE:
+                row[5] = row[7]
+            df = pd.DataFrame(columns=['HPC Code', 'Job Name','Percent','Start Time','Elapsed','Remaining','End Time','Description'])
+            df.loc[0] = row[:7] + ["Synthetic unit cell run"]
+            frames.append(df)
+        statuses.append(pd.concat(frames, axis = 0))
+    return pd.concat(statuses, axis = 0)
+
+# Compare building the status table from per-job DataFrames against building it in one go from status_records
+def run_table(args):
+    job_lists = fake_job_lists(args.jobs, args.folders)
+    old_time, old = time_quietly(lambda: dataframe_per_job(job_lists), args.repeat)
+    new_time, new = time_quietly(lambda: get_stat.get_status_table(job_lists), args.repeat)
+    if len(old) != len(new) or list(old['Job Name']) != list(new['Job Name']):
+        print("WARNING: the two tables don't have the same rows")
+    print()
+    print("{:>24}  {:>10}".format("table (" + str(args.jobs) + " jobs)", "best (s)"))
+    print("{:>24}  {:>10.3f}".format("DataFrame per job", old_time))
+    print("{:>24}  {:>10.3f}".format("get_status_table", new_time))
+    print("{:>24}  {:>9.1f}x".format("speedup", old_time / new_time))
+
+# Compare what it costs to send built jobs back from a worker process as pickled job objects against the
+# packed tuples jobexecutor.build_packed_chunk() sends
+def run_ipc(args):
+    root = args.root
+    if root is None:
+        root = tempfile.mkdtemp(dir=args.tmpdir)
+        print("Writing " + str(args.subfolders * args.runs) + " fake runs to " + root + "...")
+        synthtree.make_tree(root, args.subfolders, args.runs, resubmissions=args.resubmissions)
+
+    try:
+        runs = [(directory, None, None) for directory, folders, files in os.walk(root) if "velodyne.card" in files]
+        with contextlib.redirect_stdout(io.StringIO()):
+            built = jobexecutor.build_chunk(runs)
+        packed = [(directory, new_job.pack() if new_job is not None else None) for directory, new_job in built]
+        num_jobs = len(built)
+
+        results = dict()
+        for name, payload in (("job objects", built), ("packed tuples", packed)):
+            data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+            round_trip, result = time_quietly(lambda: pickle.loads(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)),
+                                              args.repeat)
+            results[name] = (len(data), round_trip)
+    finally:
+        if args.root is None:
+            shutil.rmtree(root)
+
+    print()
+    print("{:>16}  {:>14}  {:>20}".format("ipc (" + str(num_jobs) + " jobs)", "bytes per job", "pickle round trip (ms)"))
+    for name, (size, round_trip) in results.items():
+        print("{:>16}  {:>14.0f}  {:>20.3f}".format(name, size / num_jobs, round_trip * 1000))
+
+# How get_statuses() and get_html_table() used to build the table, kept here so we can compare against them:
+#
+# 1) get_statuses() formatted every cell with a lambda per row, wrapping the running jobs' cells in
+#    COUNTDOWN_START / COUNTUP_START / BG_SET_GREEN / PROGRESSBAR_START markers, and split the running,
+#    complete and canceled jobs into copies and concatenated them back together
+# 2) get_html_table() ran the table through to_html() and then swapped the markers for HTML with a regex
+#    pass per marker, each one rescanning the whole page for every match
+def legacy_countdown_code(string):
+    time = string.split("&&&")[0]
+    name = string.split("&&&")[1]
+    return "COUNTDOWN_START" + time + "COUNTDOWN_END" + "JOB_CODE_START" + str(name) + "JOB_CODE_END"
+
+def legacy_countup_code(string):
+    time = string.split("&&&")[0]
+    name = string.split("&&&")[1]
+    return "COUNTUP_START" + time + "COUNTUP_END" + "JOB_CODE_START" + str(name) + "JOB_CODE_END"
+
+def legacy_progress_bar_code(percent):
+    text = '{:.2f}'.format(percent) + "%"
+    show = "PROGRESSBAR_START" + '{:03.0f}'.format(percent) + "PROGRESSBAR_END"
+    return get_stat.insert_hover(text, show)
+
+def mapped_statuses(job_lists):
+    statuses = get_stat.get_status_table(job_lists)
+    finished = statuses.Status != job_module.RUNNING_STATE
+    statuses['Remaining'] = statuses['Remaining'].astype(object)
+    statuses.loc[finished, 'Remaining'] = statuses.loc[finished, 'Status'].astype(str)
+    statuses['Progress'] = statuses['Percent'].map(lambda pct: legacy_progress_bar_code(pct))
+    completemask = statuses.Status == "COMPLETE"
+    running = statuses.loc[~finished].copy()
+    complete = statuses.loc[completemask]
+    canceled = statuses.loc[finished & ~completemask]
+    folders = np.concatenate((running.Folder.values, complete.Folder.values, canceled.Folder.values))
+    running['Remaining'] = running['End Time'].astype(str) + "&&&" + running['Job Name'].astype(str)
+    running['Remaining'] = running['Remaining'].map(lambda string: legacy_countdown_code(string))
+    running['Elapsed'] = running['Start Time'].astype(str) + "&&&" + running['Job Name'].astype(str)
+    running['Elapsed'] = running['Elapsed'].map(lambda string: legacy_countup_code(string))
+    running = running.applymap(lambda name: "BG_SET_GREEN" + str(name))
+    statuses = pd.concat((running, complete, canceled), axis=0)
+    statuses = statuses.iloc[np.argsort(folders, kind='stable')]
+    return statuses[['HPC Code', 'Job Name', 'Elapsed', 'Remaining', 'Progress']]
+
+def legacy_embed_timers(html_string, marker, function, suffix):
+    timers = "<script>"
+    for match in re.finditer(">" + marker + "_START(.*)" + marker + "_ENDJOB_CODE_START(.*)JOB_CODE_END", html_string):
+        if len(match.groups()) > 0 and match.group(1) != "0":
+            html_string = re.sub(match.group(0), " id=\"" + match.group(2) + suffix + "\">", html_string)
+            timers = timers + "\n\t" + function + "(\"" + match.group(1) + "\",\"" + match.group(2) + suffix + "\")"
+    return html_string, timers + "\n" + "</script>"
+
+def legacy_html_table(statuses):
+    with pd.option_context('display.max_colwidth', None, 'colheader_justify', 'center'):
+        html_string = statuses.to_html(classes='mystyle', index=False)
+    html_string = html_string.replace(">BG_SET_GREEN", " style=\"color: #6c9c98\">")
+    html_string = re.sub("&gt;BG_SET_GREEN", " style=\"color: #6c9c98\">", html_string)
+    html_string = html_string.replace("PROGRESSBAR_START", "<progress value=\"")
+    html_string = html_string.replace("PROGRESSBAR_END", "\" max=\"100\"></progress>")
+    html_string, countdowns = legacy_embed_timers(html_string, "COUNTDOWN", "countdown", "CD")
+    html_string, countups = legacy_embed_timers(html_string, "COUNTUP", "countup", "CU")
+    i = 0
+    for match in re.finditer(r'<th>(.*)</th>', html_string):
+        if(len(match.group(1)) > 0) and match.group(1) != "0":
+            html_string = re.sub(match.group(0), "<th onclick=\"sort(" + str(i) + ")\">" + match.group(1) + "</th>", html_string)
+            i += 1
+    html_string = html_string.replace("<table border=","<table id=\"dataframe\" border=")
+    html_string = html_string.replace("&lt;", "<").replace("&gt;", ">")
+    return html_string, countdowns, countups
+
+# @return the (job name, time) pairs in one of the old countdown() or countup() <script>s
+def legacy_timers(script, suffix):
+    return [(ID[:-len(suffix)], time) for time, ID in re.findall(r'\w+\("([^"]*)","([^"]*)"\)', script)]
+
+# @return True if the old statuses through the old renderer make the same table and timers as the new ones
+def same_html(old_statuses, new_statuses):
+    old_table, countdowns, countups = legacy_html_table(old_statuses)
+    table, timers = get_stat.get_html_table(new_statuses, list())
+    timers = json.loads(timers[timers.index(">") + 1:timers.rindex("</script>")])
+    return (old_table == table[table.index("<table"):] and
+            legacy_timers(countdowns, "CD") == [(timer["id"], timer["end"]) for timer in timers] and
+            legacy_timers(countups, "CU") == [(timer["id"], timer["start"]) for timer in timers])
+
+# Compare the per-row get_statuses() against the vectorized one, and check they make the same HTML table
+def run_statuses(args):
+    job_lists = fake_job_lists(args.jobs, args.folders)
+    old_time, old = time_quietly(lambda: mapped_statuses(job_lists), args.repeat)
+    new_time, new = time_quietly(lambda: get_stat.get_all_statuses(job_lists), args.repeat)
+    if args.check and not same_html(old, new):
+        print("WARNING: the two tables don't make the same HTML")
+    print()
+    print("{:>24}  {:>10}".format("statuses (" + str(args.jobs) + " jobs)", "best (s)"))
+    print("{:>24}  {:>10.3f}".format("per-row lambdas", old_time))
+    print("{:>24}  {:>10.3f}".format("get_all_statuses", new_time))
+    print("{:>24}  {:>9.1f}x".format("speedup", old_time / new_time))
+
+# Compare to_html() and the regex passes against writing the table's rows directly, and check they agree
+def run_html(args):
+    job_lists = fake_job_lists(args.jobs, args.folders)
+    old_statuses = mapped_statuses(job_lists)
+    new_statuses = get_stat.get_all_statuses(job_lists)
+    old_time, old = time_quietly(lambda: legacy_html_table(old_statuses), args.repeat)
+    new_time, new = time_quietly(lambda: get_stat.get_html_table(new_statuses, list()), args.repeat)
+    if not same_html(old_statuses, new_statuses):
+        print("WARNING: the two tables don't make the same HTML")
+    print()
+    print("{:>24}  {:>10}".format("html (" + str(args.jobs) + " jobs)", "best (s)"))
+    print("{:>24}  {:>10.3f}".format("to_html + regex passes", old_time))
+    print("{:>24}  {:>10.3f}".format("get_html_table", new_time))
+    print("{:>24}  {:>9.1f}x".format("speedup", old_time / new_time))
+
+# How you'd compare a LoadCell curve across a sweep before hdf5aggregate: get_timehist() for every job,
+# concatenate them, and reduce / resample the lot
+def concatenated_timehists(jobs, grid):
+    df = pd.concat([j.get_timehist() for j in jobs])
+    summary = df.groupby('Job Name', sort=False)['Force'].agg(['max', 'last'])
+    resampled = {name: np.interp(grid, group['time'].values, group['Force'].values, left=np.nan, right=np.nan)
+                 for name, group in df.groupby('Job Name', sort=False)}
+    return df, summary, resampled
+
+# Compare reading every job's timehist.h5 into one big DataFrame against hdf5aggregate.aggregate()
+def run_aggregate(args):
+    root = args.root
+    if root is None:
+        root = tempfile.mkdtemp(dir=args.tmpdir)
+        print("Writing " + str(args.subfolders * args.runs) + " fake runs with HDF5 files to " + root + "...")
+        synthtree.make_tree(root, args.subfolders, args.runs, hdf5_rows=args.hdf5_rows)
+
+    try:
+        runs = [(directory, None, None) for directory, folders, files in os.walk(root) if "velodyne.card" in files]
+        with contextlib.redirect_stdout(io.StringIO()):
+            jobs = [new_job for directory, new_job in jobexecutor.build_chunk(runs) if new_job is not None]
+        grid = np.linspace(0.0, 0.01, args.grid)
+        old_time, old = time_quietly(lambda: concatenated_timehists(jobs, grid), args.repeat)
+        with jobexecutor.job_executor("process", args.workers, 1) as executor:
+            new_time, new = time_quietly(lambda: hdf5aggregate.aggregate(jobs, "timehist.h5", hdf5reader.TIMEHIST_DATA,
+                                                                         ["Force"], ["max", "final"], grid,
+                                                                         executor=executor), args.repeat)
+        if not (np.allclose(old[1]['max'].values, new.summary['Force max'].values) and
+                np.allclose(old[1]['last'].values, new.summary['Force final'].values)):
+            print("WARNING: the two don't agree")
+    finally:
+        if args.root is None:
+            shutil.rmtree(root)
+
+    print()
+    print("{:>24}  {:>10}  {:>14}".format("aggregate (" + str(len(jobs)) + " jobs)", "best (s)", "held (MB)"))
+    print("{:>24}  {:>10.3f}  {:>14.1f}".format("concatenated DataFrames", old_time, old[0].memory_usage(deep=True).sum() / 1e6))
+    print("{:>24}  {:>10.3f}  {:>14.1f}".format("hdf5aggregate", new_time,
+                                              (new.summary.memory_usage(deep=True).sum() +
+                                               new.resampled.memory_usage(deep=True).sum()) / 1e6))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the Velodyne status scripts")
+    subparsers = parser.add_subparsers(dest="benchmark")
+    subparsers.required = True
+
+    tail = subparsers.add_parser("tail", help="block-based vs. byte-at-a-time tail reader")
+    tail.add_argument("--file", help="tail an existing file instead of generating one")
+    tail.add_argument("--size-mb", type=int, default=2048, help="size of the generated log (default: 2048)")
+    tail.add_argument("--tmpdir", help="where to write the generated log (default: system temp dir)")
+    tail.add_argument("--lines", type=int, nargs="+", default=[1, 2, 15, 100], help="N values to tail")
+    tail.add_argument("--repeat", type=int, default=5, help="take the best of this many calls")
+    tail.set_defaults(run=run_tail)
+
+    sweep = subparsers.add_parser("sweep", help="executor kind x worker count x chunk size for a full scan")
+    sweep.add_argument("--root", help="scan an existing tree instead of generating one")
+    sweep.add_argument("--tmpdir", help="where to write the generated tree (default: system temp dir)")
+    sweep.add_argument("--subfolders", type=int, default=8, help="subfolders in the generated tree (default: 8)")
+    sweep.add_argument("--runs", type=int, default=50, help="runs per subfolder (default: 50)")
+    sweep.add_argument("--output-mb", type=float, default=0.01, help="size of each .o file (default: 0.01)")
+    sweep.add_argument("--timestep-mb", type=float, default=0.01, help="size of each status.timestep (default: 0.01)")
+    sweep.add_argument("--executors", nargs="+", choices=jobexecutor.EXECUTOR_KINDS, default=list(jobexecutor.EXECUTOR_KINDS))
+    sweep.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 32])
+    sweep.add_argument("--chunk-sizes", type=int, nargs="+", default=[1, 16, 64])
+    sweep.add_argument("--repeat", type=int, default=3, help="take the best of this many scans")
+    sweep.add_argument("--json", help="also write the results to this file")
+    sweep.set_defaults(run=run_sweep)
+
+    e2e = subparsers.add_parser("e2e", help="time scanning, get_statuses and print_to_HTML separately")
+    e2e.add_argument("--root", help="use an existing tree instead of generating one")
+    e2e.add_argument("--tmpdir", help="where to write the generated tree and pages (default: system temp dir)")
+    e2e.add_argument("--subfolders", type=int, default=8, help="subfolders in the generated tree (default: 8)")
+    e2e.add_argument("--runs", type=int, default=50, help="runs per subfolder (default: 50)")
+    e2e.add_argument("--output-mb", type=float, default=1, help="size of each .o file (default: 1)")
+    e2e.add_argument("--timestep-mb", type=float, default=2, help="size of each status.timestep (default: 2)")
+    e2e.add_argument("--resubmissions", type=int, default=1, help="older .o files per run (default: 1)")
+    e2e.add_argument("--hdf5", action="store_true", help="also write HDF5 result files (needs h5py)")
+    e2e.add_argument("--hdf5-rows", type=int, default=10000, help="rows per HDF5 dataset (default: 10000)")
+    e2e.add_argument("--executor", choices=jobexecutor.EXECUTOR_KINDS, default=None, help="default: EXECUTOR in config.py")
+    e2e.add_argument("--workers", type=int, default=None, help="default: WORKERS in config.py")
+    e2e.add_argument("--chunk-size", type=int, default=None, help="default: CHUNK_SIZE in config.py")
+    e2e.add_argument("--repeat", type=int, default=3, help="take the best of this many runs of each stage")
+    e2e.add_argument("--json", help="also write the results to this file")
+    e2e.set_defaults(run=run_e2e)
+
+    table = subparsers.add_parser("table", help="DataFrame per job vs. one columnar status table")
+    table.add_argument("--jobs", type=int, default=10000, help="number of fake jobs (default: 10000)")
+    table.add_argument("--folders", type=int, default=100, help="folders to split them over (default: 100)")
+    table.add_argument("--repeat", type=int, default=3, help="take the best of this many builds")
+    table.set_defaults(run=run_table)
+
+    ipc = subparsers.add_parser("ipc", help="pickled bytes per job: job objects vs. packed tuples")
+    ipc.add_argument("--root", help="use an existing tree instead of generating one")
+    ipc.add_argument("--tmpdir", help="where to write the generated tree (default: system temp dir)")
+    ipc.add_argument("--subfolders", type=int, default=8, help="subfolders in the generated tree (default: 8)")
+    ipc.add_argument("--runs", type=int, default=50, help="runs per subfolder (default: 50)")
+    ipc.add_argument("--resubmissions", type=int, default=1, help="older .o files per run (default: 1)")
+    ipc.add_argument("--repeat", type=int, default=3, help="take the best of this many round trips")
+    ipc.set_defaults(run=run_ipc)
+
+    statuses = subparsers.add_parser("statuses", help="per-row vs. vectorized get_statuses()")
+    statuses.add_argument("--jobs", type=int, default=50000, help="number of fake jobs (default: 50000)")
+    statuses.add_argument("--folders", type=int, default=100, help="folders to split them over (default: 100)")
+    statuses.add_argument("--repeat", type=int, default=3, help="take the best of this many runs")
+    statuses.add_argument("--check", action="store_true",
+                          help="also check both make the same HTML (slow, the old renderer is quadratic)")
+    statuses.set_defaults(run=run_statuses)
+
+    html = subparsers.add_parser("html", help="to_html() + regex passes vs. writing the table rows directly")
+    html.add_argument("--jobs", type=int, default=2000, help="number of fake jobs (default: 2000)")
+    html.add_argument("--folders", type=int, default=20, help="folders to split them over (default: 20)")
+    html.add_argument("--repeat", type=int, default=3, help="take the best of this many runs")
+    html.set_defaults(run=run_html)
+
+    aggregate = subparsers.add_parser("aggregate", help="concatenated get_timehist() vs. hdf5aggregate.aggregate()")
+    aggregate.add_argument("--root", help="use an existing tree with HDF5 files instead of generating one")
+    aggregate.add_argument("--tmpdir", help="where to write the generated tree (default: system temp dir)")
+    aggregate.add_argument("--subfolders", type=int, default=2, help="subfolders in the generated tree (default: 2)")
+    aggregate.add_argument("--runs", type=int, default=20, help="runs per subfolder (default: 20)")
+    aggregate.add_argument("--hdf5-rows", type=int, default=200000, help="rows per HDF5 dataset (default: 200000)")
+    aggregate.add_argument("--grid", type=int, default=1000, help="points on the common time grid (default: 1000)")
+    aggregate.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    aggregate.add_argument("--repeat", type=int, default=3, help="take the best of this many runs")
+    aggregate.set_defaults(run=run_aggregate)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
+
+# ----------------------------------------------------------------------------------------------------------- #
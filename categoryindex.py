@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import re
+import threading
+import numpy as np
+import pandas as pd
+from itertools import chain
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# @return the tokens of a job name for the job filter dropdown (e.g., "unit_cell_3" gives "cell" and "3")
+def split_name(name):
+    ## UGLY CODING BUT I DON'T REALLY CARE
+    name = name.replace("BG_SET_GREEN", "")
+    return tuple(re.split(', |_|-|!', name[3:]))
+
+# The tokens of every job name we've seen, for the job filter dropdown's index of which rows of the table
+# each category is in (see get_rows())
+#
+# Names are only split the first time we see them, so a refresh doesn't re-split the name of every job
+# again. status_cache keeps one up to date as jobs come in and saves it along with the jobs, so finished
+# jobs never get split again either.
+#
+# add() can be called from several threads at once (e.g., the run_walker's, through status_cache.get_job())
+class category_index:
+
+    def __init__(self):
+        # Every token we've seen, and {token: its position in tokens}
+        self.tokens = list()
+        self.token_ids = dict()
+        # {job name: the positions of its tokens in tokens}
+        self.names = dict()
+        # Held while a new name's tokens are added, so two threads can't give a token two positions
+        self.lock = threading.Lock()
+
+    # The lock can't be pickled, so it's left out of the status cache and a new one made when it's read back
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    # Add a job name to the index, if it isn't in it already
+    #
+    # A name only goes into names once all its tokens are in, so names we've already seen are looked up
+    # without the lock
+    #
+    # @return the positions of its tokens in tokens
+    def add(self, name):
+        ids = self.names.get(name)
+        if ids is not None:
+            return ids
+        with self.lock:
+            ids = self.names.get(name)
+            if ids is not None:
+                return ids
+            ids = list()
+            for token in split_name(name):
+                token_id = self.token_ids.get(token)
+                if token_id is None:
+                    token_id = len(self.tokens)
+                    self.token_ids[token] = token_id
+                    self.tokens.append(token)
+                ids.append(token_id)
+            self.names[name] = ids
+        return ids
+
+    def add_all(self, names):
+        for name in names:
+            self.add(name)
+
+    # Work out which rows of a table each category is in
+    #
+    # A category is any token that turns up more than once over the whole table (either in two job names, or
+    # twice in one). names is the Job Name of every row of the table, and any that aren't in the index yet are
+    # added to it. Everything past looking up each distinct name's tokens is done on whole arrays at once.
+    #
+    # @return {category: sorted list of the rows whose job name has it}
+    def get_rows(self, names):
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        token_lists = [self.add(name) for name in uniques]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        if lengths.sum() == 0:
+            return dict()
+
+        # One entry per (distinct name, token) pair
+        pair_tokens = np.fromiter(chain.from_iterable(token_lists), dtype=np.int64, count=lengths.sum())
+        pair_names = np.repeat(np.arange(len(uniques)), lengths)
+
+        # How many times each token turns up over the whole table
+        name_rows = np.bincount(codes, minlength=len(uniques))
+        occurrences = np.bincount(pair_tokens, weights=name_rows[pair_names], minlength=len(self.tokens))
+        keep = (occurrences > 1)[pair_tokens]
+        pair_tokens = pair_tokens[keep]
+        pair_names = pair_names[keep]
+        if len(pair_tokens) == 0:
+            return dict()
+
+        # Expand each (name, token) pair into a (row, token) pair for every row with that name
+        rows_by_name = np.argsort(codes, kind='stable')
+        name_starts = np.concatenate(([0], np.cumsum(name_rows)[:-1]))
+        counts = name_rows[pair_names]
+        pair_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rows = rows_by_name[np.repeat(name_starts[pair_names] - pair_starts, counts) + np.arange(counts.sum())]
+        tokens = np.repeat(pair_tokens, counts)
+
+        # Sort by token then row, drop the rows a token's in twice, and split it up by token
+        order = np.lexsort((rows, tokens))
+        rows = rows[order]
+        tokens = tokens[order]
+        unique = np.ones(len(rows), dtype=bool)
+        unique[1:] = (tokens[1:] != tokens[:-1]) | (rows[1:] != rows[:-1])
+        rows = rows[unique]
+        tokens = tokens[unique]
+        splits = np.flatnonzero(tokens[1:] != tokens[:-1]) + 1
+        return {self.tokens[token_rows[0]]: row_list.tolist()
+                for token_rows, row_list in zip(np.split(tokens, splits), np.split(rows, splits))}
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Settings for how globalstatus.py scans the tree. Every one of these can also be overridden on the
+# command line (see "python globalstatus.py --help"), and "python benchmark.py sweep" will help you pick them.
+
+# How many interns scan the tree and build jobs. None picks min(32, CPUs + 4), which suits a filesystem-bound
+# scan with threads; for "process" you'll probably want about the number of CPUs
+WORKERS = None # <------------------------------------------------------------------------------------- EDIT
+
+# How the interns run:
+#   "thread"    threads in this process (cheapest to start, fine since we're mostly waiting on the filesystem)
+#   "process"   a pool of worker processes (worth it if parsing, not the filesystem, is the bottleneck)
+#   "asyncio"   an event loop handing the blocking file reads to a thread pool
+EXECUTOR = "thread" # <-------------------------------------------------------------------------------- EDIT
+
+# How many run folders each intern is handed at a time. Bigger chunks mean less overhead per run folder,
+# smaller chunks spread the work more evenly
+CHUNK_SIZE = 16 # <------------------------------------------------------------------------------------ EDIT
+
+# How the job table goes on the HTML page:
+#   "full"      every job is a row of the table, sorted and filtered by moving the rows around the page
+#   "virtual"   the jobs are a JSON list the page sorts and filters, and only the rows you can see are drawn
+#   "auto"      "full" up to VIRTUAL_TABLE_ROWS jobs, "virtual" past that
+TABLE_MODE = "auto" # <-------------------------------------------------------------------------------- EDIT
+VIRTUAL_TABLE_ROWS = 2000 # <-------------------------------------------------------------------------- EDIT
+
+# In the virtual table, how many jobs go in the page itself. The rest are split into files of this many
+# jobs next to the page that it fetches once it's up, so it shows up right away however many jobs there
+# are. 0 puts every job in the page
+PAGE_ROWS = 5000 # <----------------------------------------------------------------------------------- EDIT
+
+# ----------------------------------------------------------------------------------------------------------- #
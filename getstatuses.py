@@ -4,70 +4,204 @@
 # Import general libraries
 import os
 import re
+import json
+import stat
+import hashlib
+import time
+import tempfile
+import numpy as np
 import pandas as pd
+from html import escape
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
+# Import custom scripts
+import config
+import tracing
+import categoryindex
+from job import get_terminal_states, RUNNING_STATE
+
 # ----------------------------------------------------------------------------------------------------------- #
 
-def print_to_HTML(statuses, start_time):
-    import time
-    
-    statuses.reset_index()
-    home_location = "/beegfs/interns/esnell/Unit_Cells/Home1.html" # <----------------------- EDIT LOCATION
-    about_location = "/beegfs/interns/esnell/Unit_Cells/About1.html" # <--------------------- EDIT LOCATION
+# Where the HTML pages get written
+HOME_LOCATION = "/beegfs/interns/esnell/Unit_Cells/Home1.html" # <----------------------- EDIT LOCATION
+ABOUT_LOCATION = "/beegfs/interns/esnell/Unit_Cells/About1.html" # <--------------------- EDIT LOCATION
+
+# Write the home page (with the status table) and the about page, unless they haven't changed
+#
+# Every section of the home page except the footer (which has the time and the script run time in it) goes
+# into a digest that's kept at the bottom of the page. If the page we'd write has the same digest as the one
+# that's already there, we leave the file alone: the web server keeps handing out the same Last-Modified and
+# ETag, so browsers get a "304 Not Modified" instead of the whole page again, and the shared filesystem
+# doesn't see a write. The about page never changes, so it's only written if it's missing or out of date,
+# and only looked at once per process. Pass force=True to write both pages regardless.
+#
+# The home page is streamed into a temporary file next to home_location a piece at a time--the header, then
+# the table rows, then the scripts--with the digest worked out as it goes, so the whole page never sits in
+# memory at once. It's only swapped in once it's all there (see atomic_write()), so nobody loading the page
+# mid-write sees it empty or half-written, and if its digest turns out to match the page's on disk, the
+# temporary file is deleted instead.
+#
+# table_mode picks between the full table and the virtual one (see TABLE_MODE in config.py), and defaults
+# to config.TABLE_MODE. The virtual table's files of rows are written before the page that lists them.
+#
+# categories is the categoryindex.category_index to find the job filter categories with (e.g., the status
+# cache's, so the names it's already split aren't split again)
+def print_to_HTML(statuses, start_time, home_location=HOME_LOCATION, about_location=ABOUT_LOCATION, force=False,
+                  table_mode=None, categories=None):
     try:
-    
-        # CLEAR CONTENTS OF HOME FILE
-        try:
-            file = open(home_location,"r+")
-            file.truncate(0)
-            file.close()
-        except Exception as e:
-            print("ERROR CLEARING HOME FILE:")
-            print("\t" + str(e))
-    
-        # SET PANDAS OPTIONS
-        pd.set_option('colheader_justify', 'center')
-
-        # SET UP HTML OUTPUT STRING
-        table, countdowns, countups = get_html_table(statuses, get_categories(statuses))
-        
         # WRITE HOME PAGE
-        with open(home_location, 'a') as f:
-            home_page = return_home_page(home_location, about_location, table, countdowns, countups)
-            home_page = home_page.replace("&lt;", "<").replace("&gt;", ">")
-            run_time = "{:.2f}".format(time.time() - start_time) + " seconds"
-            home_page = home_page.replace("EMBED_RUN_TIME", run_time)
-            f.write(home_page)
+        with tracing.span("write", location=home_location, rows=len(statuses)) as span:
+            row_pages = list()
+            with atomic_write(home_location) as f:
+                pieces = render_home_page(statuses, home_location, about_location, table_mode, categories, row_pages)
+                for piece in pieces:
+                    if piece is FOOTER:
+                        run_time = "{:.2f}".format(time.time() - start_time) + " seconds"
+                        f.write(return_home_page_footer(run_time), hashed=False)
+                    else:
+                        f.write(piece)
+                digest = f.hexdigest()
+                if not force and digest == read_digest(home_location):
+                    f.discard = True
+                else:
+                    write_row_pages(get_rows_location(home_location), row_pages)
+                    f.write(return_digest(digest), hashed=False)
+            if not f.discard:
+                remove_row_pages(get_rows_location(home_location), row_pages)
+            elif tracing.is_enabled():
+                span.args["unchanged"] = True
         
         # WRITE ABOUT PAGE
-        with open(about_location, 'w') as f:
-            f.write(return_about_page(home_location, about_location))
+        with tracing.span("write", location=about_location):
+            write_about_page(home_location, about_location, force)
         
     except Exception as e:
         print(e)
 
-# remove truncation of table elements
-pd.set_option('display.max_colwidth', -1)
-# ignore chained assignment warnings created by subsetting statuses into complete, running, canceled
-pd.options.mode.chained_assignment = None  # default='warn'
+# The about pages we've already checked or written
+about_pages = set()
 
-def insert_countdown_code(string):
-    time = string.split("&&&")[0]
-    name = string.split("&&&")[1]
-    return "COUNTDOWN_START" + time + "COUNTDOWN_END" + "JOB_CODE_START" + str(name) + "JOB_CODE_END"
-    
-def insert_countup_code(string):
-    time = string.split("&&&")[0]
-    name = string.split("&&&")[1]
-    return "COUNTUP_START" + time + "COUNTUP_END" + "JOB_CODE_START" + str(name) + "JOB_CODE_END"
+# Write the about page if it's missing or out of date
+def write_about_page(home_location, about_location, force=False):
+    if not force and about_location in about_pages:
+        return
+    digest = hashlib.sha1(return_about_page(home_location, about_location, "").encode()).hexdigest()
+    if force or digest != read_digest(about_location):
+        with atomic_write(about_location) as f:
+            f.write(return_about_page(home_location, about_location))
+            f.write(return_digest(digest))
+    about_pages.add(about_location)
+
+# Where the footer goes in the pieces render_home_page() gives you. It has the script's run time in it, so it's
+# written (and left out of the digest) once everything before it is
+FOOTER = object()
+
+# Render the home page a piece at a time, so the rows go straight into the file instead of all sitting in memory
+#
+# The virtual table's files of rows (see render_row_feed()) are added to row_pages, before the first piece
+#
+# @return a generator of the pieces of the page up to the digest, with FOOTER where the footer goes
+def render_home_page(statuses, home_location, about_location, table_mode=None, categories=None, row_pages=None):
+    if categories is None:
+        categories = categoryindex.category_index()
+    if row_pages is None:
+        row_pages = list()
+    with tracing.span("categories"):
+        category_rows = categories.get_rows(statuses['Job Name'].values)
+    if get_table_mode(statuses, table_mode) == "virtual":
+        feed, pages = render_row_feed(statuses, os.path.basename(get_rows_location(home_location)))
+        row_pages.extend(pages)
+        yield return_home_page_start(home_location, about_location)
+        yield return_dropdowns(sorted(category_rows))
+        yield render_virtual_table()
+    else:
+        timers = list()
+        yield return_home_page_start(home_location, about_location)
+        yield return_dropdowns(sorted(category_rows))
+        yield render_table_head()
+        yield from render_rows(statuses, timers)
+        yield TABLE_END
+        feed = render_timer_feed(timers)
+    yield FOOTER
+    yield return_home_page_scripts(render_category_feed(category_rows) + feed)
+
+# The digest goes in a comment on the last line of the page
+DIGEST_PATTERN = re.compile(rb"<!-- digest: ([0-9a-f]+) -->\s*$")
+
+def return_digest(digest):
+    return "\n<!-- digest: " + digest + " -->\n"
+
+# @return the digest on the last line of the page at location, or None if there's no page or no digest
+def read_digest(location):
+    try:
+        with open(location, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 128))
+            tail = f.read()
+    except OSError:
+        return None
+    match = DIGEST_PATTERN.search(tail)
+    if match is None:
+        return None
+    return match.group(1).decode()
+
+# A file being written by atomic_write(), which keeps a sha1 of everything written to it (except what's
+# written with hashed=False) for the page's digest. Set discard to throw it away instead of swapping it in.
+class page_file:
+
+    def __init__(self, f):
+        self.file = f
+        self.sha1 = hashlib.sha1()
+        self.discard = False
+
+    def write(self, text, hashed=True):
+        if hashed:
+            self.sha1.update(text.encode())
+        self.file.write(text)
+
+    def writelines(self, pieces):
+        for piece in pieces:
+            self.write(piece)
+
+    # @return the sha1 of what's been written so far, in hex
+    def hexdigest(self):
+        return self.sha1.hexdigest()
+
+# Open a temporary file in the same folder as location to write to (as a page_file), then flush it to disk
+# and swap it in for location in one go with os.replace(). If anything goes wrong, or the page_file is marked
+# discard, the temporary file is thrown away and location is left as it was.
+@contextmanager
+def atomic_write(location):
+    directory = os.path.dirname(os.path.abspath(location))
+    handle, temp_location = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(location) + ".")
+    try:
+        with os.fdopen(handle, 'w') as f:
+            page = page_file(f)
+            yield page
+            if not page.discard:
+                f.flush()
+                os.fsync(f.fileno())
+        if page.discard:
+            os.remove(temp_location)
+            return
+        # mkstemp() makes the file readable by us only, but the web server has to be able to read the page
+        try:
+            mode = stat.S_IMODE(os.stat(location).st_mode)
+        except OSError:
+            mode = 0o644
+        os.chmod(temp_location, mode)
+        os.replace(temp_location, location)
+    except BaseException:
+        try:
+            os.remove(temp_location)
+        except OSError:
+            pass
+        raise
 
 def format_datetime(time):
     return time.strftime('%b %d %y %H:%M:%S')
 
-def insert_green_background(item):
-    return "BG_SET_GREEN" + str(item)
-    
 def format_timedelta(timedelta_obj):
     days, seconds = timedelta_obj.days, timedelta_obj.seconds
     hours = str(days * 24 + seconds // 3600).zfill(2)
@@ -81,77 +215,243 @@ def format_percent(percent):
 def format_float(flt):
     return '{:.3f}'.format(flt)
 
-def insert_progress_bar_code(percent):
-    text = '{:.2f}'.format(percent) + "%"
-    show = "PROGRESSBAR_START" + '{:03.0f}'.format(percent) + "PROGRESSBAR_END"
-    return insert_hover(text, show)
-
-def get_categories(statuses):
-    job_names = list()
-    for name in statuses['Job Name'].tolist():
-        ## UGLY CODING BUT I DON'T REALLY CARE
-        name = name.replace("BG_SET_GREEN", "")
-        vals = re.split(', |_|-|!', name[3:])
-        for val in vals:
-            job_names.append(val)
-        
-    import collections
-    seen = set()
-    duplicates = set()
-    for val in job_names:
-        if val in seen:
-            duplicates.add(val)
-        else:
-            seen.add(val)
-    return sorted(duplicates)
+# @return the sorted categories for the job filter dropdown: every token that turns up more than once in
+#         the table's job names (see categoryindex.py). Pass in a category_index to reuse the names it's
+#         already split.
+def get_categories(statuses, categories=None):
+    if categories is None:
+        categories = categoryindex.category_index()
+    return sorted(categories.get_rows(statuses['Job Name'].values))
+
+# @return obj as JSON in a <script> with the given ID, for the page's script to read. Every "</" is escaped,
+#         so nothing in the JSON can close the <script> early
+def script_json(ID, obj, sort_keys=False):
+    feed = json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys)
+    return "<script type=\"application/json\" id=\"" + ID + "\">" + feed.replace("</", "<\\/") + "</script>\n"
+
+# @return a JSON <script> of {category: the rows of the table in it}, for the job filter dropdown to look
+#         rows up in
+def render_category_feed(category_rows):
+    return script_json("categories", category_rows, sort_keys=True)
 
 def insert_hover(text, show):
     return """<div class="tooltip">""" + show + """<span class="tooltiptext">""" + text + """</span></div>"""
 
+# The columns of the status table, in the order of the fields of a job.status_record
+STATUS_COLUMNS = ['HPC Code', 'Job Name', 'Percent', 'Start Time', 'Elapsed', 'Remaining', 'End Time', 'Status']
+
+# For turning datetimes and timedeltas into numpy's datetime64 / timedelta64 (microseconds since EPOCH)
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NAT = np.iinfo(np.int64).min
+
+# "00" to "99", for padding hours, minutes and seconds without formatting every number one at a time
+TWO_DIGITS = np.array(['{:02d}'.format(i) for i in range(100)], dtype=object)
+
+# A column of datetimes (or None) as datetime64
+#
+# Much quicker than handing pandas the datetime objects, which it checks one at a time
+def to_datetime64(values):
+    return np.fromiter(((value - EPOCH) // MICROSECOND if value is not None else NAT for value in values),
+                       np.int64, len(values)).view('datetime64[us]')
+
+# A column of timedeltas (or None) as timedelta64, see to_datetime64()
+def to_timedelta64(values):
+    return np.fromiter((value // MICROSECOND if value is not None else NAT for value in values),
+                       np.int64, len(values)).view('timedelta64[us]')
+
+# Turn a timedelta64 Series into the same strings pandas gives you (e.g., "0 days 00:16:28"), working on the
+# whole column at once instead of building a Timedelta for every row
+#
+# NaT and negative timedeltas are rare enough to leave to pandas
+def format_timedeltas(timedeltas):
+    nanoseconds = timedeltas.values.view(np.int64)
+    plain = nanoseconds >= 0
+    seconds, fraction = np.divmod(np.where(plain, nanoseconds, 0), 10**9)
+    days, seconds = np.divmod(seconds, 86400)
+    hours, seconds = np.divmod(seconds, 3600)
+    minutes, seconds = np.divmod(seconds, 60)
+    text = (days.astype(str).astype(object) + " days " + TWO_DIGITS[hours] + ":" + TWO_DIGITS[minutes] + ":" +
+            TWO_DIGITS[seconds])
+    fractional = fraction != 0
+    if fractional.any():
+        microseconds, leftover = np.divmod(fraction[fractional], 1000)
+        text[fractional] = (text[fractional] + "." + np.char.zfill(microseconds.astype(str), 6).astype(object) +
+                            np.where(leftover != 0, np.char.zfill(leftover.astype(str), 3), "").astype(object))
+    if not plain.all():
+        text[~plain] = timedeltas[~plain].astype(str).values
+    return text
+
+# Build the status table for every job in one go, from the job.status_record each one keeps in timing_data
+#
+# Every column gets a proper type instead of object: Percent is a float, the times are datetime64, Elapsed
+# and Remaining are timedelta64 (Remaining is NaT once a job's finished), and Status is a category of
+# RUNNING_STATE plus every terminal state.
+#
+# Takes a list of job lists, one per folder, and adds a Folder column with the index of the list each job
+# came from. With descriptions=True there's also a Description column, which means parsing every job's
+# velodyne card for it, so the HTML page leaves it off.
+#
+# @return a pandas DataFrame with STATUS_COLUMNS plus Folder (and Description)
+def get_status_table(job_lists, descriptions=False):
+    records = [job.timing_data for job_list in job_lists for job in job_list]
+    with tracing.span("status_table", jobs=len(records)):
+        columns = list(zip(*records)) if len(records) > 0 else [()] * len(STATUS_COLUMNS)
+        states = [RUNNING_STATE] + get_terminal_states()
+        states = states + sorted(set(columns[7]) - set(states))
+        statuses = pd.DataFrame({
+            'HPC Code': pd.Series(columns[0], dtype=object),
+            'Job Name': pd.Series(columns[1], dtype=object),
+            'Percent': np.array(columns[2], dtype=float),
+            'Start Time': to_datetime64(columns[3]),
+            'Elapsed': to_timedelta64(columns[4]),
+            'Remaining': to_timedelta64(columns[5]),
+            'End Time': to_datetime64(columns[6]),
+            'Status': pd.Categorical(np.array(columns[7], dtype=object), categories=states),
+            'Folder': np.repeat(np.arange(len(job_lists)), [len(job_list) for job_list in job_lists]),
+        })
+        if descriptions:
+            statuses['Description'] = [job.description for job_list in job_lists for job in job_list]
+    return statuses
+
+# Format the status table for the HTML page, see get_all_statuses() below
 def get_statuses(joblist):
+    return get_all_statuses([joblist])
+
+# Format the status table for every job in a list of job lists (one per folder, like globaljobs.return_all_jobs()
+# gives you) for the HTML page
+#
+# Each folder's jobs stay together, in the order the lists came in, with its running jobs first, then
+# complete, then canceled. Every column is built for the whole table at once with operations on the
+# columns (no per-row lambdas, and no splitting the table up and concatenating it back together).
+#
+# @return a pandas DataFrame with the columns:
+#   HPC Code, Job Name:     as strings
+#   Elapsed, Remaining:     as strings for finished jobs (Remaining is how they ended), "" for running jobs
+#   Percent:                as a float
+#   Status:                 RUNNING_STATE or the terminal state, as a category
+#   Start Time, End Time:   as strings for running jobs, for the page's timers to count from, "" for finished jobs
+def get_all_statuses(job_lists):
     
     # COLLECT ALL JOBS INTO DATAFRAME
-    statuses = list()
-    for job in joblist:
-        statuses.append(job.timing_data)
-    statuses = pd.concat(statuses, axis = 0)
+    statuses = get_status_table(job_lists)
 
-    # columns=['HPC Code', 'Job Name','Percent','Start Time','Elapsed','Remaining','End Time','Description']
-    
-    # FORMAT PROGRESS w/ HOVER
-    statuses['Progress'] = statuses['Percent'].map(lambda pct: insert_progress_bar_code(pct))
-    
     # FIND RUNNING JOBS
-    cancelmask = statuses.Remaining == "CANCELED"
-    completemask = statuses.Remaining == "COMPLETE"
-    runningmask = ~(cancelmask | completemask)
-
-    # CREATE NEW DATAFRAMES TO AVOID NEED FOR LOC LATER ON
-    running = statuses.loc[runningmask]
-    complete = statuses.loc[completemask]
-    canceled = statuses.loc[cancelmask]  
-     
-    # INSERT JAVASCRIPT TIMERS
-    running['Remaining'] = running['End Time'].astype(str) + "&&&" + running['Job Name'].astype(str)
-    running['Remaining'] = running['Remaining'].map(lambda string: insert_countdown_code(string))
-    running['Elapsed'] = running['Start Time'].astype(str) + "&&&" + running['Job Name'].astype(str)
-    running['Elapsed'] = running['Elapsed'].map(lambda string: insert_countup_code(string))
-   
-    # FORMAT RUNNING JOBS TO HAVE LIGHT GREEN FONT
-    running = running.applymap(lambda name: insert_green_background(str(name)))
-    
+    #
+    # Anything with a terminal state other than COMPLETE (CANCELED, TIMEOUT, OOM, ...) is grouped with the canceled jobs
+    running = (statuses.Status == RUNNING_STATE).values
+    group = np.where(running, 0, np.where((statuses.Status == "COMPLETE").values, 1, 2))
+
+    # Finished jobs show how long they took and how they ended
+    remaining = statuses['Status'].astype(str).values.astype(object)
+    elapsed = format_timedeltas(statuses['Elapsed'])
+    remaining[running] = ""
+    elapsed[running] = ""
+
+    # Running jobs get timers instead, see render_rows()
+    #
+    # The times are turned into strings for the running jobs only, since pandas picks one format for a
+    # whole column and the finished jobs' times could change it
+    start_times = np.full(len(statuses), "", dtype=object)
+    end_times = np.full(len(statuses), "", dtype=object)
+    start_times[running] = statuses['Start Time'][running].astype(str).values
+    end_times[running] = statuses['End Time'][running].astype(str).values
+
     # REFORM TABLE
-    statuses = pd.concat((running, complete, canceled), axis=0)
+    #
+    # Sorted by folder, then running / complete / canceled, keeping the jobs' own order inside each group
+    order = np.lexsort((group, statuses['Folder'].values))
+    statuses = pd.DataFrame({'HPC Code': statuses['HPC Code'].astype(str).values[order],
+                             'Job Name': statuses['Job Name'].astype(str).values[order],
+                             'Elapsed': elapsed[order],
+                             'Remaining': remaining[order],
+                             'Percent': statuses['Percent'].values[order],
+                             'Status': statuses['Status'].values.take(order),
+                             'Start Time': start_times[order],
+                             'End Time': end_times[order]},
+                            index=statuses.index.values[order])
     
     # FORMAT JOB NAME w/ HOVER (IMPLENTATION OFF B/C TOOLTIPS APPEAR BEHIND OTHER TABLE TEXT)
     ## statuses['Job Name'] = statuses.apply(lambda x: insert_hover(x['Description'], x['Job Name']), axis=1)
-
-    # DROP UNUSED COLUMNS
-    statuses = statuses[['HPC Code', 'Job Name', 'Elapsed', 'Remaining', 'Progress']]
     
     return statuses
-        
-def get_html_table(statuses, categories):
+
+# @return a digest of what the page shows of the table from get_all_statuses(): every cell as it's written,
+#         with the percentage rounded like the progress bar's hover text and the running jobs' start and end
+#         times (which the timers count from) to the second, so a job's end time moving by a few microseconds
+#         doesn't count as a change
+def get_table_digest(statuses):
+    shown = pd.DataFrame({'HPC Code': statuses['HPC Code'].values,
+                          'Job Name': statuses['Job Name'].values,
+                          'Elapsed': statuses['Elapsed'].values,
+                          'Remaining': statuses['Remaining'].values,
+                          'Percent': np.char.mod('%.2f', statuses['Percent'].values.astype(float)),
+                          'Status': statuses['Status'].astype(str).values,
+                          'Start Time': statuses['Start Time'].str.slice(0, 19).values,
+                          'End Time': statuses['End Time'].str.slice(0, 19).values})
+    return hashlib.sha1(shown.to_csv(index=False).encode()).hexdigest()
+
+# The columns of the table on the page
+TABLE_COLUMNS = ['HPC Code', 'Job Name', 'Elapsed', 'Remaining', 'Progress']
+
+# Running jobs are written in light green
+RUNNING_STYLE = " style=\"color: #6c9c98\""
+
+# @return the opening of the table on the page, up to the first row, with a sort() handler on every header
+def render_table_head():
+    head = "<table id=\"dataframe\" border=\"1\" class=\"dataframe mystyle\">\n  <thead>\n    <tr style=\"text-align: center;\">\n"
+    for i, column in enumerate(TABLE_COLUMNS):
+        head = head + "      <th onclick=\"sort(" + str(i) + ")\">" + column + "</th>\n"
+    return head + "    </tr>\n  </thead>\n  <tbody>\n"
+
+TABLE_END = "  </tbody>\n</table>"
+
+# @return a progress bar for percent, with the exact percentage when you hover over it
+def render_progress(percent):
+    return insert_hover('{:.2f}'.format(percent) + "%",
+                        "<progress value=\"" + '{:03.0f}'.format(percent) + "\" max=\"100\"></progress>")
+
+# Write the table's rows one at a time, straight from the columns get_all_statuses() gives you
+#
+# A running job's Elapsed and Remaining cells are left empty with an ID for the page's timer to fill in, and
+# its (job name, start time, end time, status) is added to timers as we go
+#
+# @return a generator of the HTML for each row
+def render_rows(statuses, timers):
+    columns = [statuses[column].values for column in ['HPC Code', 'Job Name', 'Elapsed', 'Remaining', 'Percent',
+                                                      'Status', 'Start Time', 'End Time']]
+    for code, name, elapsed, remaining, percent, status, start_time, end_time in zip(*columns):
+        code = escape(code, quote=False)
+        text = escape(name, quote=False)
+        if status == RUNNING_STATE:
+            timers.append((name, start_time, end_time, status))
+            yield ("    <tr>\n"
+                   "      <td" + RUNNING_STYLE + ">" + code + "</td>\n"
+                   "      <td" + RUNNING_STYLE + ">" + text + "</td>\n"
+                   "      <td" + RUNNING_STYLE + " id=\"" + escape(name) + "CU\"></td>\n"
+                   "      <td" + RUNNING_STYLE + " id=\"" + escape(name) + "CD\"></td>\n"
+                   "      <td" + RUNNING_STYLE + ">" + render_progress(percent) + "</td>\n"
+                   "    </tr>\n")
+        else:
+            yield ("    <tr>\n"
+                   "      <td>" + code + "</td>\n"
+                   "      <td>" + text + "</td>\n"
+                   "      <td>" + escape(elapsed, quote=False) + "</td>\n"
+                   "      <td>" + escape(remaining, quote=False) + "</td>\n"
+                   "      <td>" + render_progress(percent) + "</td>\n"
+                   "    </tr>\n")
+
+# @return a JSON <script> with an {id, start, end, status} for each of the (job name, start time, end time,
+# status) timers, for the page's timer to read
+def render_timer_feed(timers):
+    return script_json("timers", [{"id": ID, "start": start, "end": end, "status": str(status)}
+                                  for ID, start, end, status in timers])
+
+# @return the job filter and status dropdowns that go above the table
+#
+# Past Running, Complete and Canceled, the status dropdown has every other terminal state our output
+# detectors can give a job (see job.register_output_detector())
+def return_dropdowns(categories):
     dropdown = """
          <div class="dropdowns">
             <select id="joblist" onchange="dropdown()">
@@ -166,6 +466,8 @@ def get_html_table(statuses, categories):
               <option>Running</option>
               <option>Complete</option>
               <option>Canceled</option>
+""" + "".join("              <option>" + escape(state, quote=False) + "</option>\n"
+              for state in dict.fromkeys(get_terminal_states()) if state not in ("COMPLETE", "CANCELED")) + """\
             </select>
             <div id="dropdown-padding">
             </div>
@@ -178,73 +480,121 @@ def get_html_table(statuses, categories):
     for category in categories:
         dropdown = dropdown + "<option>" + str(category) + "</option>\n"
     dropdown = dropdown + dropdown_end + "\n</select>"
+    return dropdown  + spacer + "\n"
+
+# The dropdowns and the whole table as one string, see render_home_page() for the page print_to_HTML() writes
+#
+# @return (dropdowns and table, timer <script>)
+def get_html_table(statuses, categories):
+    timers = list()
+    rows = "".join(render_rows(statuses, timers))
+    output_table = return_dropdowns(categories) + render_table_head() + rows + TABLE_END
     
-    output_table = dropdown  + spacer + "\n" + statuses.to_html(classes='mystyle', index=False)
-    
-    # ORDER IS IMPORTANT FOR RegEx SEARCHES
-    output_table = embed_green_background(output_table)
-    output_table = create_progress_bars(output_table)
-    output_table, countdowns = embed_countdowns(output_table)
-    output_table, countups = embed_countups(output_table)
-    output_table = enable_sorting(output_table)
-    
-    output_table = output_table.replace("<table border=","<table id=\"dataframe\" border=")
-    
-    return output_table, countdowns, countups
+    return output_table, render_timer_feed(timers)
+
+# @return "full" or "virtual", whichever table_mode (or config.TABLE_MODE) picks for this many jobs
+def get_table_mode(statuses, table_mode=None):
+    if table_mode is None:
+        table_mode = config.TABLE_MODE
+    if table_mode == "auto":
+        return "virtual" if len(statuses) > config.VIRTUAL_TABLE_ROWS else "full"
+    return table_mode
+
+# @return where the virtual table's files of rows go for the page at home_location (e.g., Home1_rows/)
+def get_rows_location(home_location):
+    return os.path.splitext(home_location)[0] + "_rows"
+
+# @return the position of each row when the whole table is sorted by order (from np.argsort or np.lexsort)
+def get_ranks(order):
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+# Work out a sort key for every row for every column of the table, so the page can sort by any column by
+# comparing integers instead of the text in the cells
+#
+#   HPC Code, Job Name:     alphabetical, ignoring case
+#   Elapsed:                running jobs first, latest start first, then the rest by how long they took
+#   Remaining:              running jobs first, soonest end first, then the rest by how they ended
+#   Progress:               percent
+#
+# Running jobs go by their Start and End Times instead of how long they've been going or have left right now,
+# so the keys (and so the page's digest) stay the same from one pass to the next while nothing changes
+#
+# Ties keep the order of the table
+#
+# @return a (rows x TABLE_COLUMNS) array of ranks
+def get_sort_keys(statuses):
+    running = (statuses['Status'] == RUNNING_STATE).values
+    elapsed = np.zeros(len(statuses))
+    ends = np.zeros(len(statuses))
+    if (~running).any():
+        elapsed[~running] = pd.to_timedelta(statuses['Elapsed'].values[~running], errors='coerce').total_seconds()
+    if running.any():
+        # Seconds since the epoch, with the latest start first
+        starts = pd.to_datetime(statuses['Start Time'].values[running], errors='coerce')
+        elapsed[running] = -(starts - pd.Timestamp(0)).total_seconds()
+        ends[running] = (pd.to_datetime(statuses['End Time'].values[running], errors='coerce') -
+                         pd.Timestamp(0)).total_seconds()
+    ended = np.unique(statuses['Remaining'].values.astype(str), return_inverse=True)[1]
+    keys = [np.argsort(statuses['HPC Code'].str.lower().values, kind='stable'),
+            np.argsort(statuses['Job Name'].str.lower().values, kind='stable'),
+            np.lexsort((np.nan_to_num(elapsed, nan=-np.inf), ~running)),
+            np.lexsort((np.nan_to_num(ends, nan=np.inf), ended, ~running)),
+            np.argsort(statuses['Percent'].values, kind='stable')]
+    return np.column_stack([get_ranks(order) for order in keys])
+
+# The virtual table's rows, as JSON lists of:
+#
+#   [HPC Code, Job Name, Elapsed, Remaining, Percent, Status, Start Time, End Time, sort key for each column]
+#
+# with the same text as the full table's cells (running jobs get their Elapsed and Remaining from their
+# Start and End Times on the page). The first config.PAGE_ROWS rows go in the page itself and the rest are
+# split into files of config.PAGE_ROWS rows in the rows_folder next to it, which the page fetches once it's
+# up. The files' names have a digest of every row in the files, so a browser fetches them again only when
+# they've changed.
+#
+# @return (JSON <script> for the page, list of (file name, JSON text) for each file of rows)
+def render_row_feed(statuses, rows_folder):
+    columns = [statuses[column].values for column in ['HPC Code', 'Job Name', 'Elapsed', 'Remaining']]
+    columns.append(np.round(statuses['Percent'].values.astype(float), 2))
+    columns.append(statuses['Status'].astype(str).values)
+    columns.extend(statuses[column].values for column in ['Start Time', 'End Time'])
+    columns.extend(get_sort_keys(statuses).T)
+    rows = [list(row) for row in zip(*[column.tolist() for column in columns])]
     
-def create_progress_bars(html_string):
-    html_string = html_string.replace("PROGRESSBAR_START", "<progress value=\"")
-    return html_string.replace("PROGRESSBAR_END", "\" max=\"100\"></progress>")
+    page_rows = config.PAGE_ROWS if config.PAGE_ROWS > 0 else max(1, len(rows))
+    pages = [json.dumps(rows[i:i + page_rows], separators=(",", ":")) for i in range(page_rows, len(rows), page_rows)]
+    digest = hashlib.sha1("".join(pages).encode()).hexdigest()[:12]
+    row_pages = [("rows-" + str(i) + "-" + digest + ".json", page) for i, page in enumerate(pages, 1)]
     
-def embed_countdowns(html_string):
-    countdowns = "<script>"
-    for match in re.finditer(">COUNTDOWN_START(.*)COUNTDOWN_ENDJOB_CODE_START(.*)JOB_CODE_END", html_string):
-        if len(match.groups()) > 0 and match.group(1) != "0":
-            date = match.group(1)
-            code = match.group(2)
-                
-            # Update HTML to have ID element in right spot
-            html_embedding = " id=\"" + code + "CD\">"
-            js_embedding = "countdown(\"" + date + "\",\"" + code + "CD\")"
-            html_string = re.sub(match.group(0), html_embedding, html_string)
-                
-            # Update JS to embed countdown element @ ID
-            countdowns = countdowns + "\n\t" + js_embedding
-    countdowns = countdowns + "\n" + "</script>" 
-    return html_string, countdowns
-
-def embed_countups(html_string):
-    countups = "<script>"
-    for match in re.finditer(">COUNTUP_START(.*)COUNTUP_ENDJOB_CODE_START(.*)JOB_CODE_END", html_string):
-        if len(match.groups()) > 0 and match.group(1) != "0":
-            date = match.group(1)
-            code = match.group(2)
-                
-            # Update HTML to have ID element in right spot
-            html_embedding = " id=\"" + code + "CU\">"
-            js_embedding = "countup(\"" + date + "\",\"" + code + "CU\")"
-            html_string = re.sub(match.group(0), html_embedding, html_string)
-                
-            # Update JS to embed countdown element @ ID
-            countups = countups + "\n\t" + js_embedding
-    countups = countups + "\n" + "</script>" 
-    return html_string, countups
-
-def embed_green_background(html_string):
-    html_string = html_string.replace(">BG_SET_GREEN", " style=\"color: #6c9c98\">") 
-    html_string = re.sub("&gt;BG_SET_GREEN", " style=\"color: #6c9c98\">", html_string)
-    return html_string
-
-def enable_sorting(html_string):
-    i = 0
-    for match in re.finditer(r'<th>(.*)</th>', html_string): 
-        # ONLY LOOK FOR TAGS WITH INFORMATION IN THEM
-        if(len(match.group(1)) > 0) and match.group(1) != "0":
-            sort_function = "<th onclick=\"sort(" + str(i) + ")\">" + match.group(1) + "</th>"
-            html_string = re.sub(match.group(0), sort_function, html_string)
-            i += 1
-
-    return html_string
+    feed = {"rows": rows[:page_rows], "pages": [rows_folder + "/" + name for name, page in row_pages]}
+    return script_json("rows", feed), row_pages
+
+# Write the virtual table's files of rows into the folder at location (the ones that are already there haven't
+# changed, since their names have the digest of their rows)
+def write_row_pages(location, row_pages):
+    if len(row_pages) > 0:
+        os.makedirs(location, exist_ok=True)
+    for name, page in row_pages:
+        if not os.path.exists(os.path.join(location, name)):
+            with atomic_write(os.path.join(location, name)) as f:
+                f.write(page)
+
+# Delete the files of rows in the folder at location that aren't in row_pages, once the page that used them
+# has been replaced
+def remove_row_pages(location, row_pages):
+    names = set(name for name, page in row_pages)
+    if os.path.isdir(location):
+        for name in os.listdir(location):
+            if name.startswith("rows-") and name.endswith(".json") and name not in names:
+                os.remove(os.path.join(location, name))
+
+# @return the virtual table: a box you scroll through, holding the table head and whichever rows the page
+#         draws (see startVirtualTable() in return_javascript())
+def render_virtual_table():
+    return ("<div id=\"virtual-table\" style=\"height: 75vh; overflow-y: auto;\">\n" + render_table_head() + TABLE_END +
+            "\n</div>")
 
 def return_javascript():
     return """
@@ -267,43 +617,202 @@ def return_javascript():
   sleep2.style.display = "none";
   sleep3.style.display = "none";
 
-  function countdown(date, ID) {
-    var countDownDate = new Date(date).getTime();
-    var x = setInterval(function() {
+  // Every running job's Elapsed and Remaining cells are filled in by one timer that ticks once a second,
+  // from the JSON list of {id, start, end, status} in the "timers" <script> at the bottom of the page
+  function formatTimer(distance) {
+    var days = Math.floor(distance / (1000 * 60 * 60 * 24));
+    var hours = Math.floor((distance % (1000 * 60 * 60 * 24)) / (1000 * 60 * 60));
+    var minutes = Math.floor((distance % (1000 * 60 * 60)) / (1000 * 60));
+    var seconds = Math.floor((distance % (1000 * 60)) / 1000);
+    return days + " days " + hours + ":" + minutes + ":" + seconds;
+  }
+
+  function startTimers() {
+    var feed = document.getElementById("timers");
+    if (feed === null) {
+      return;
+    }
+    var timers = JSON.parse(feed.textContent).map(function(timer) {
+      return {up: document.getElementById(timer.id + "CU"), down: document.getElementById(timer.id + "CD"),
+              start: new Date(timer.start).getTime(), end: new Date(timer.end).getTime()};
+    });
+    function tick() {
       var now = new Date().getTime();
-      var distance = countDownDate - now;
-      var days = Math.floor(distance / (1000 * 60 * 60 * 24));
-      var hours = Math.floor((distance % (1000 * 60 * 60 * 24)) / (1000 * 60 * 60));
-      var minutes = Math.floor((distance % (1000 * 60 * 60)) / (1000 * 60));
-      var seconds = Math.floor((distance % (1000 * 60)) / 1000);
-
-      document.getElementById(ID).innerHTML = days + " days " + hours + ":" + minutes + ":" + seconds;
-      if (distance < 0) {
-        clearInterval(x);
-        document.getElementById(ID).innerHTML = "COMPLETE";
+      for (var i = 0; i < timers.length; i++) {
+        var elapsed = now - timers[i].start;
+        var remaining = timers[i].end - now;
+        timers[i].up.innerHTML = elapsed < 0 ? "INVALID TIME" : formatTimer(elapsed);
+        timers[i].down.innerHTML = remaining < 0 ? "COMPLETE" : formatTimer(remaining);
       }
-    }, 1000);
+    }
+    tick();
+    setInterval(tick, 1000);
   }
 
-  function countup(date, ID) {
-    var countUpDate = new Date(date).getTime();
-    var x = setInterval(function() {
-      var now = new Date().getTime();
-      var distance = now - countUpDate;
-      var days = Math.floor(distance / (1000 * 60 * 60 * 24));
-      var hours = Math.floor((distance % (1000 * 60 * 60 * 24)) / (1000 * 60 * 60));
-      var minutes = Math.floor((distance % (1000 * 60 * 60)) / (1000 * 60));
-      var seconds = Math.floor((distance % (1000 * 60)) / 1000);
-
-      document.getElementById(ID).innerHTML = days + " days " + hours + ":" + minutes + ":" + seconds;
-      if (distance < 0) {
-        clearInterval(x);
-        document.getElementById(ID).innerHTML = "INVALID TIME";
+  startTimers();
+
+  // The virtual table, when the page has one: every job is a row of a list, which the dropdowns and the
+  // column headers filter and sort, and only the rows you can scroll to are drawn. Each row is
+  //   [HPC Code, Job Name, Elapsed, Remaining, Percent, Status, Start Time, End Time, sort key for each column]
+  // (see render_row_feed() in getstatuses.py). The first rows come in the "rows" <script> at the bottom of
+  // the page and the rest are fetched from the files it lists.
+  var virtualTable = null;
+
+  function escapeHTML(text) {
+    return String(text).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+  }
+
+  function startVirtualTable() {
+    var feed = document.getElementById("rows");
+    if (feed === null) {
+      return;
+    }
+    var data = JSON.parse(feed.textContent);
+    virtualTable = {rows: data.rows, shown: [], column: -1, ascending: true, rowHeight: 0,
+                    box: document.getElementById("virtual-table"),
+                    body: document.getElementById("dataframe").tBodies[0]};
+    virtualTable.box.addEventListener("scroll", function() {
+      window.requestAnimationFrame(drawRows);
+    });
+    filterRows();
+    setInterval(drawRows, 1000);
+    fetchRows(data.pages, 0);
+  }
+
+  // Fetch the files of rows one after the other, adding each one to the table as it comes in
+  function fetchRows(pages, i) {
+    if (i >= pages.length) {
+      return;
+    }
+    fetch(pages[i]).then(function(response) {
+      return response.json();
+    }).then(function(rows) {
+      for (var j = 0; j < rows.length; j++) {
+        virtualTable.rows.push(rows[j]);
+      }
+      filterRows();
+      fetchRows(pages, i + 1);
+    }).catch(function(error) {
+      console.log("Could not fetch " + pages[i] + ": " + error);
+    });
+  }
+
+  // Work out which rows pass the dropdowns, in the order of the column we're sorted by, and draw them
+  function filterRows() {
+    var namefilter = document.getElementById("joblist").value.toUpperCase();
+    var statusfilter = document.getElementById("jobstatus").value.toUpperCase();
+    var rows = virtualTable.rows;
+    var shown = [];
+    var category = document.getElementById("joblist").value;
+    if (categoryRows !== null && categoryRows.hasOwnProperty(category)) {
+      // Only the rows in the category need looking at (and only the ones we've fetched so far)
+      var candidates = categoryRows[category];
+      for (var i = 0; i < candidates.length && candidates[i] < rows.length; i++) {
+        if (statusfilter == "SELECT JOB STATUS" || rows[candidates[i]][5].toUpperCase().indexOf(statusfilter) > -1) {
+          shown.push(candidates[i]);
+        }
+      }
+    } else {
+      for (var i = 0; i < rows.length; i++) {
+        var jobvalid = namefilter == "SELECT JOB FILTER" || rows[i][1].toUpperCase().indexOf(namefilter) > -1;
+        var statusvalid = statusfilter == "SELECT JOB STATUS" || rows[i][5].toUpperCase().indexOf(statusfilter) > -1;
+        if (jobvalid && statusvalid) {
+          shown.push(i);
+        }
       }
-    }, 1000);
+    }
+    if (virtualTable.column >= 0) {
+      var key = 8 + virtualTable.column;
+      var direction = virtualTable.ascending ? 1 : -1;
+      shown.sort(function(a, b) {
+        return direction * (rows[a][key] - rows[b][key]);
+      });
+    }
+    virtualTable.shown = shown;
+    drawRows();
+  }
+
+  function drawRow(row, now) {
+    var style = "";
+    var elapsed = escapeHTML(row[2]);
+    var remaining = escapeHTML(row[3]);
+    if (row[6] !== "") {
+      style = ' style="color: #6c9c98"';
+      var distance = now - new Date(row[6]).getTime();
+      elapsed = distance < 0 ? "INVALID TIME" : formatTimer(distance);
+      distance = new Date(row[7]).getTime() - now;
+      remaining = distance < 0 ? "COMPLETE" : formatTimer(distance);
+    }
+    var progress = '<div class="tooltip"><progress value="' + Math.round(row[4]) + '" max="100"></progress>' +
+      '<span class="tooltiptext">' + row[4].toFixed(2) + '%</span></div>';
+    return "<tr><td" + style + ">" + escapeHTML(row[0]) + "</td><td" + style + ">" + escapeHTML(row[1]) +
+      "</td><td" + style + ">" + elapsed + "</td><td" + style + ">" + remaining + "</td><td" + style + ">" +
+      progress + "</td></tr>";
   }
 
+  // Draw the rows you can see (and a few either side), with empty rows above and below them standing in
+  // for the rest so the scroll bar is the right size
+  function drawRows() {
+    var table = virtualTable;
+    var rowHeight = table.rowHeight > 0 ? table.rowHeight : 30;
+    var first = Math.max(0, Math.floor(table.box.scrollTop / rowHeight) - 10);
+    var last = Math.min(table.shown.length, first + Math.ceil(table.box.clientHeight / rowHeight) + 20);
+    var now = new Date().getTime();
+    var html = ['<tr style="height: ' + first * rowHeight + 'px"></tr>'];
+    for (var i = first; i < last; i++) {
+      html.push(drawRow(table.rows[table.shown[i]], now));
+    }
+    html.push('<tr style="height: ' + (table.shown.length - last) * rowHeight + 'px"></tr>');
+    table.body.innerHTML = html.join("");
+    if (table.rowHeight == 0 && last > first) {
+      table.rowHeight = table.body.rows[1].offsetHeight || 30;
+      drawRows();
+    }
+  }
+
+  // The rows of the table in each category of the job filter, from the "categories" <script> at the bottom
+  // of the page (see render_category_feed() in getstatuses.py), so filtering by one is a lookup instead of a
+  // search through every job name. Each row of the full table remembers where it started out, since sort()
+  // moves them around.
+  var categoryRows = null;
+
+  function startCategories() {
+    var feed = document.getElementById("categories");
+    if (feed === null) {
+      return;
+    }
+    categoryRows = JSON.parse(feed.textContent);
+    var table = document.getElementById("dataframe");
+    if (virtualTable === null && table !== null) {
+      var rows = table.tBodies[0].rows;
+      for (var i = 0; i < rows.length; i++) {
+        rows[i].categoryRow = i;
+      }
+    }
+  }
+
+  // @return an array with true for every row in the category picked in the job filter, or null if there
+  // isn't one
+  function getCategoryRows(namefilter, rowCount) {
+    if (categoryRows === null || !categoryRows.hasOwnProperty(namefilter)) {
+      return null;
+    }
+    var inCategory = new Array(rowCount).fill(false);
+    var rows = categoryRows[namefilter];
+    for (var i = 0; i < rows.length; i++) {
+      inCategory[rows[i]] = true;
+    }
+    return inCategory;
+  }
+
+  startVirtualTable();
+  startCategories();
+
   function dropdown() {
+    if (virtualTable !== null) {
+      filterRows();
+      return;
+    }
     var nameinput, namefilter, statusinput, statusfilter, table, tr, i;
     nameinput = document.getElementById("joblist");
     namefilter = nameinput.value.toUpperCase();
@@ -311,6 +820,7 @@ def return_javascript():
     statusfilter = statusinput.value.toUpperCase();
     table = document.getElementById("dataframe");
     tr = table.getElementsByTagName("tr");
+    var inCategory = getCategoryRows(nameinput.value, tr.length);
     for (i = 0; i < tr.length; i++) {
       var tdName, tdStatus, jobvalid, statusvalid, td_id, isRunning;
       tdName = tr[i].getElementsByTagName("td")[1];
@@ -325,7 +835,11 @@ def return_javascript():
         }
       } catch (error) {}
       if (tdName && tdStatus) {
-        jobvalid = tdName.innerHTML.toUpperCase().indexOf(namefilter.toUpperCase()) > -1 || namefilter == "SELECT JOB FILTER";
+        if (inCategory !== null && tr[i].categoryRow !== undefined) {
+          jobvalid = inCategory[tr[i].categoryRow];
+        } else {
+          jobvalid = tdName.innerHTML.toUpperCase().indexOf(namefilter.toUpperCase()) > -1 || namefilter == "SELECT JOB FILTER";
+        }
         statusvalid = tdStatus.innerHTML.toUpperCase().indexOf(statusfilter.toUpperCase()) > -1 || statusfilter == "SELECT JOB STATUS";
         var runningANDrunning = isRunning && statusfilter.toUpperCase() == "RUNNING";
         statusvalid = statusvalid || (isRunning && statusfilter.toUpperCase() == "RUNNING");
@@ -343,6 +857,10 @@ def return_javascript():
     for (var i = 0; i < elements.length; i++) {
       elements[i].selectedIndex = 0;
     }
+    if (virtualTable !== null) {
+      filterRows();
+      return;
+    }
     var table = document.getElementById("dataframe");
     var tr = table.getElementsByTagName("tr");
     for (i = 0; i < tr.length; i++) {
@@ -358,6 +876,12 @@ def return_javascript():
 
   function sort(element) {
     sort_direction = !sort_direction
+    if (virtualTable !== null) {
+      virtualTable.column = element;
+      virtualTable.ascending = !sort_direction;
+      filterRows();
+      return;
+    }
     var table, rows, switching, i, x, y, shouldSwitch;
     table = document.getElementById("dataframe");
     switching = true;
@@ -1087,8 +1611,11 @@ def return_wave():
     </div>    
     """
 
-def return_about_page(home_location, about_location):
+def return_about_page(home_location, about_location, updated=None):
     # Returns the about page that explains how the script works
+    # updated is the "Last Updated" time in the footer, now if it's None
+    if updated is None:
+        updated = datetime.now().strftime("%I:%M %p")
     home_location = home_location.replace("/beegfs", "")
     about_location = about_location.replace("/beegfs", "")
     return "<!DOCTYPE html>" + return_CSS_styling() + \
@@ -1118,7 +1645,7 @@ def return_about_page(home_location, about_location):
                 If not... how to run automatically:
                 
                 <ul>
-                    <li>Change globalstatus.py to chdir() to your desired directory when running auto mode.</li>
+                    <li>Change the root directory in globalstatus.py to your desired directory when running auto mode.</li>
                     <li>You'll want a file lock to prevent the script from running if it is already going. 
                         We use <a href="https://stackoverflow.com/questions/2366693/run-cron-job-only-if-it-isnt-already-running">flock</a> for this purpose.
                         Create a file called flock.locfile somewhere in your directory.
@@ -1202,7 +1729,7 @@ def return_about_page(home_location, about_location):
                 </ul>
 	    <div style="height: 85px; overflow: hidden; width: 100%;"></div>
         <div id="footer">
-            <p class="footer">Tool developed by <a href="mailto:eric.snell@corvidtec.com">Eric Snell</a>.""" + " | Last Updated: " + str(datetime.now().strftime("%I:%M %p")) + """</p>
+            <p class="footer">Tool developed by <a href="mailto:eric.snell@corvidtec.com">Eric Snell</a>.""" + " | Last Updated: " + updated + """</p>
         </div>
         </div>
     </div>
@@ -1210,8 +1737,8 @@ def return_about_page(home_location, about_location):
 </html>
 """ + return_javascript()
 
-def return_home_page(home_location, about_location, table, countdowns, countups):
-    # Returns a nice little home page
+# The home page up to where the table goes
+def return_home_page_start(home_location, about_location):
     home_location = home_location.replace("/beegfs", "")
     about_location = about_location.replace("/beegfs", "")
     return "<!DOCTYPE html>" + return_CSS_styling() + \
@@ -1225,16 +1752,27 @@ def return_home_page(home_location, about_location, table, countdowns, countups)
         <div class="body">
             <div style="height: 10px; overflow: hidden; width: 100%;"></div>
             <div class="wsite-spacer" style="height:10px;"></div>
-            <div class="myTABLE">""" + \
-                table + \
-            """</div>
+            <div class="myTABLE">"""
+
+# The home page after the table: the footer, which changes every time, and the scripts
+def return_home_page_footer(run_time):
+    return """</div>
             <div style="height: 70px; width: 100%;"></div>
             <div id="footer">
-                <p class="footer">Tool developed by <a href="mailto:eric.snell@corvidtec.com">Eric Snell</a>.""" + " | Last Updated: " + str(datetime.now().strftime("%I:%M %p")) + " | Script Run Time: EMBED_RUN_TIME" + """</p>
+                <p class="footer">Tool developed by <a href="mailto:eric.snell@corvidtec.com">Eric Snell</a>.""" + " | Last Updated: " + str(datetime.now().strftime("%I:%M %p")) + " | Script Run Time: " + run_time + """</p>
             </div>
         </div></div>
     </body>
 </html>
-""" + return_javascript() + countdowns + countups
+"""
+
+# The categories and the timers (or the virtual table's rows) go before the page's script, which reads them
+def return_home_page_scripts(feed):
+    return feed + return_javascript()
+
+def return_home_page(home_location, about_location, table, timers):
+    # Returns a nice little home page
+    return return_home_page_start(home_location, about_location) + table + \
+        return_home_page_footer("EMBED_RUN_TIME") + return_home_page_scripts(timers)
 
 # ----------------------------------------------------------------------------------------------------------- #
\ No newline at end of file
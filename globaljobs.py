@@ -10,13 +10,15 @@ import localjobs
 
 # ----------------------------------------------------------------------------------------------------------- #
 
-# For every folder in the current working directory, call localjobs.py's return_jobs_given_terms
+# For every folder in the root directory, call localjobs.py's return_jobs_given_terms
 #
 # If it's on auto mode, it will have no search or exclusion terms and simply grab everything
 # If it's off auto mode, it will ask the user for search terms
 #
+# Pass in a status_cache to reuse jobs from the last scan (see statuscache.py)
+#
 # @return a list of lists of jobs
-def return_all_jobs(auto):
+def return_all_jobs(root, auto, cache=None):
     if auto:
         search_terms = ""
         excluded_terms = ""
@@ -24,18 +26,11 @@ def return_all_jobs(auto):
         search_terms, excluded_terms = localjobs.get_input()
         print()
 
-    subfolders = list()
-    for i in os.listdir():
-        if os.path.isdir(i):
-            subfolders.append(i)
-
     jobs = list()
-    for folder in subfolders:
-        os.chdir(folder)
-        subfolder_jobs = localjobs.return_jobs_given_terms(search_terms, excluded_terms)
+    for folder in localjobs.get_subfolders(root):
+        subfolder_jobs = localjobs.return_jobs_given_terms(os.path.join(root, folder), search_terms, excluded_terms, cache)
         if(len(subfolder_jobs) > 0):
             jobs.append(subfolder_jobs)
-        os.chdir("../")
      
     return jobs
     
@@ -6,25 +6,32 @@ import os
 import time
 import pandas as pd
 import datetime as datetime
-from multiprocessing import Pool
 
 # Import custom scripts
 import localjobs
+import rundiscovery
+import jobexecutor
 
 # ----------------------------------------------------------------------------------------------------------- #
 
-# For every folder in the current working directory, call localjobs.py's return_jobs_given_terms
+# Find every Velodyne run under the root directory, at any depth
 #
 # If it's on auto mode, it will have no search or exclusion terms and simply grab everything
 # If it's off auto mode, it will ask the user for search terms
 #
-# @return a list of lists of jobs
+# @return a list of lists of jobs, one list per folder that has runs in it
 #
 # This method is faster than globaljobs.py's version because it uses a pool of interns to run each job
 # in order to distribute the work
 #
-# Each intern is responsible for a subfolder of jobs
-def return_all_jobs(auto):
+# The interns share out individual folders rather than whole subfolders (see rundiscovery.py), so the work
+# stays balanced whatever shape the tree is. The run folders they find are then parsed by a job_executor
+# (see jobexecutor.py), a chunk of run folders at a time. Pass in your own to pick the kind of pool, the
+# number of workers and the chunk size, or to reuse the pool between calls; otherwise we use the settings
+# in config.py for this call only.
+#
+# Pass in a status_cache to reuse jobs from the last scan (see statuscache.py)
+def return_all_jobs(root, auto, cache=None, executor=None):
 
     # Grab timing information, just for fun
     start_time = time.time()
@@ -32,31 +39,22 @@ def return_all_jobs(auto):
     print("Running parallel implementation to get all global jobs...")
     print()
     
-    # We use global variables for the search and exclusion terms for the mapping of pooled scripts
-    global search_terms
-    global excluded_terms
     if auto:
         search_terms = ""
         excluded_terms = ""
     else:
         search_terms, excluded_terms = localjobs.get_input()
 
-    # We're going to grab all the subfolders...
-    subfolders = list()
-    for i in os.listdir():
-        if os.path.isdir(i):
-            subfolders.append(i)
-    subfolders.sort()
-
-    # Then create a child task for each subfolder and map that to our run_subfolder method
-    # which will move the task into the relevant folder and grab all the jobs...
-    #
-    # The child task only returns a list of jobs if the length is greater than 0
-    pool = Pool(maxtasksperchild=1)
-    jobs = pool.map(run_subfolder, subfolders)
-    jobs = list(filter(None, jobs))
-    pool.close()
-    pool.join()
+    # Walk the tree and make a job for every run we find
+    if executor is None:
+        with jobexecutor.job_executor() as executor:
+            jobs = rundiscovery.discover_runs(root, search_terms, excluded_terms, cache, executor)
+    else:
+        jobs = rundiscovery.discover_runs(root, search_terms, excluded_terms, cache, executor)
+    for subfolder_jobs in jobs:
+        num_jobs = len(subfolder_jobs)
+        print("    > " + str(num_jobs) + (" jobs" if num_jobs > 1 else " job") + " loaded from " +
+              os.path.dirname(subfolder_jobs[0].directory_name) + ".")
     
     # Print timing information, just for fun
     print()
@@ -64,16 +62,5 @@ def return_all_jobs(auto):
     print("Completed. Elapsed time was " + "{:.2f}".format(elapsed) + " seconds.")
     print()
     return jobs
-    
-# We map each subfolder to this method, which just moves into the directory and gets the jobs
-#
-# @return a list of jobs IFF len(list) > 0
-def run_subfolder(folder):
-    print("    > Getting jobs from " + str(folder))
-    os.chdir(folder)
-    subfolder_jobs = localjobs.return_jobs_given_terms(search_terms, excluded_terms)
-    os.chdir("../")
-    if(len(subfolder_jobs) > 0):
-        return subfolder_jobs 
         
-# ----------------------------------------------------------------------------------------------------------- #
\ No newline at end of file
+# ----------------------------------------------------------------------------------------------------------- #
@@ -5,11 +5,17 @@
 import os
 import sys
 import time
-import pandas as pd
+import argparse
 
 # Import custom scripts
 import getstatuses as get_stat
 import globaljobsparallel as globaljobs
+import statuscache
+import statuswatch
+import hdf5summary
+import jobexecutor
+import tracing
+import config
 
 # ----------------------------------------------------------------------------------------------------------- #
 
@@ -19,37 +25,114 @@ start_time = time.time()
 # If the command lines arguments have "auto" as the first term,
 # we want to run in automatic mode--no asking for search terms and
 # excluded terms
+#
+# "watch" is automatic mode that never exits: it keeps every job in memory, rescans every --interval seconds
+# and only rewrites the HTML page when the table changed (see statuswatch.py). Stop it with SIGTERM.
+#
+# --rebuild-cache throws away the status cache and parses every job from scratch (e.g., after resubmitting
+# a canceled run), and --no-cache skips the cache entirely
+#
+# --hdf5-summaries also sums up every job's HDF5 result files that changed since they were last looked at (in
+# watch mode, on every pass) into the store in hdf5summary.py, so dashboards can read peak loads, final
+# energies and deletion counts from it
+#
+# --workers, --executor and --chunk-size override the pool settings in config.py, and --table-mode the
+# TABLE_MODE there (the full table, or the virtual one for lots of jobs)
+#
+# --trace FILE times every phase of the refresh (discovery, card/output/timestep parsing, the status table,
+# get_statuses, the HTML table and the file writes) and writes the spans to FILE, as a JSON summary or, with
+# --trace-format chrome, a trace for chrome://tracing. --profile FILE also runs everything under cProfile,
+# in every thread and worker process, and saves the combined stats to FILE (see tracing.py)
+parser = argparse.ArgumentParser(description="Write an HTML page with the status of every Velodyne job")
+parser.add_argument("mode", nargs="?", choices=["auto", "watch"], help="search everything without asking for terms")
+parser.add_argument("--rebuild-cache", action="store_true", help="ignore the status cache and parse every job again")
+parser.add_argument("--no-cache", action="store_true", help="don't read or write the status cache")
+parser.add_argument("--hdf5-summaries", action="store_true",
+                    help="update the summaries of the jobs' HDF5 files (see hdf5summary.py)")
+parser.add_argument("--interval", type=float, default=60, help="watch mode: seconds between scans (default: 60)")
+parser.add_argument("--debounce", type=float, default=5,
+                    help="watch mode: seconds after the table changes before we write it (default: 5)")
+parser.add_argument("--workers", type=int, default=config.WORKERS,
+                    help="number of interns scanning the tree (default: WORKERS in config.py)")
+parser.add_argument("--executor", choices=jobexecutor.EXECUTOR_KINDS, default=config.EXECUTOR,
+                    help="how the interns run (default: EXECUTOR in config.py)")
+parser.add_argument("--chunk-size", type=int, default=config.CHUNK_SIZE,
+                    help="run folders handed to an intern at a time (default: CHUNK_SIZE in config.py)")
+parser.add_argument("--table-mode", choices=["auto", "full", "virtual"], default=config.TABLE_MODE,
+                    help="every job in the page's table, or only the ones you can see (default: TABLE_MODE in config.py)")
+parser.add_argument("--trace", metavar="FILE", help="write how long each phase took to FILE")
+parser.add_argument("--trace-format", choices=["json", "chrome"], default="json",
+                    help="json summary per phase and worker, or a chrome://tracing trace (default: json)")
+parser.add_argument("--profile", metavar="FILE", help="run under cProfile and save the stats to FILE")
+args = parser.parse_args()
+
+if args.trace is not None or args.profile is not None:
+    tracing.enable(profile=args.profile is not None)
+
 auto = False
-try:
-    if len(sys.argv) > 1:
-        if(sys.argv[1] == "auto"):
-            auto = True
-            # Change this line to the directory in which you want to search for jobs <---------------- EDIT
-            os.chdir("/beegfs/interns/esnell/Unit_Cells/")
-except Exception as e:
-    print(e)
+root = os.getcwd()
+if args.mode in ("auto", "watch"):
+    auto = True
+    # Change this line to the directory in which you want to search for jobs <---------------- EDIT
+    root = "/beegfs/interns/esnell/Unit_Cells/"
+
+# Load the jobs from the last run, so we only re-parse what changed
+cache = None
+if not args.no_cache:
+    cache = statuscache.status_cache(rebuild=args.rebuild_cache)
+
+# The pool of interns that parses the jobs
+executor = jobexecutor.job_executor(args.executor, args.workers, args.chunk_size)
+
+# Watch mode takes over from here until it's told to stop, reusing the same pool for every refresh
+if args.mode == "watch":
+    if cache is None:
+        cache = statuscache.status_cache(rebuild=True)
+    watcher = statuswatch.status_watcher(root, cache, args.interval, args.debounce, persist=not args.no_cache,
+                                         executor=executor, trace_location=args.trace, trace_format=args.trace_format,
+                                         table_mode=args.table_mode,
+                                         summaries=hdf5summary.summary_store() if args.hdf5_summaries else None)
+    watcher.run()
+    executor.shutdown()
+    if args.profile is not None:
+        tracing.write_profile(args.profile)
+    sys.exit(0)
 
 # Get jobs using the parallelized implementation of global jobs
 #
 # This will return a list of lists of jobs
 # Each sublist represents a folder with several Velodyne run folders inside it
 #
-statuses = list()
 # Use the mode specified by the command line arguments
-for job_list in globaljobs.return_all_jobs(auto):
-    # Get the job statuses for each job list returned by global jobs
-    statuses.append(get_stat.get_statuses(job_list))
+job_lists = tracing.profiled(globaljobs.return_all_jobs, root, auto, cache, executor)
+
+# Sum up the HDF5 files that changed, on the same pool
+if args.hdf5_summaries:
+    with tracing.span("hdf5_summaries"):
+        hdf5summary.summary_store().refresh([new_job for job_list in job_lists for new_job in job_list], executor)
+executor.shutdown()
 
 # Format pandas DataFrame
 #
-# We concatenate all the job statuses from each job list together into one big dataframe
-statuses = pd.concat(statuses, axis = 0)
-statuses.reset_index()
+# The statuses for every job list returned by global jobs are built as one big dataframe, grouped by folder
+with tracing.span("get_statuses", jobs=sum(len(job_list) for job_list in job_lists)):
+    statuses = tracing.profiled(get_stat.get_all_statuses, job_lists)
+
+# Save the jobs for next time
+if cache is not None:
+    cache.save()
 
 # Print HTML output
 #
 # We then ask our getstatuses.py script to write an HTML page with our job status information
 # Note that we pass in the start time so the website updates with the total script run time
-get_stat.print_to_HTML(statuses, start_time)
+tracing.profiled(get_stat.print_to_HTML, statuses, start_time, table_mode=args.table_mode,
+                 categories=cache.categories if cache is not None else None)
+
+# Write out where the time went, if we were asked to
+if args.trace is not None:
+    tracing.write(args.trace, args.trace_format)
+if args.profile is not None:
+    tracing.write_profile(args.profile)
 
 # ----------------------------------------------------------------------------------------------------------- # 
\ No newline at end of file
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import numpy as np
+import pandas as pd
+import h5py as h5
+from collections import namedtuple
+
+# Import custom scripts
+import hdf5reader
+from jobexecutor import job_executor
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Compare the same HDF5 dataset across a whole list of jobs (e.g., the LoadCell curve of every run in a
+# parameter sweep) without calling job.get_timehist() on each one and concatenating the DataFrames
+#
+#   result = hdf5aggregate.aggregate(jobs, "timehist.h5", hdf5reader.TIMEHIST_DATA, fields=["Force"],
+#                                    reductions=["max", "final"], grid=np.linspace(0, 0.01, 500))
+#   result.summary      one row per job: Job Name, "Force max", "Force final"
+#   result.resampled    Force for every job on the 500 grid times: indexed by time, a column per job
+#
+# Each job's file is read by a worker process hdf5reader.CHUNK_ROWS rows at a time, and each chunk is folded
+# into the reductions and the resampled curve before the next one's read, so neither the worker nor we ever
+# hold a whole dataset. Only the reduced values come back.
+
+# What aggregate() can work out for each field
+REDUCTIONS = ("max", "min", "mean", "final")
+
+# What aggregate() returns: a DataFrame of the reductions with a row per job, and, if you gave it a time grid,
+# a DataFrame indexed by the grid with a (field, Job Name) column for every job (None otherwise)
+aggregate_result = namedtuple("aggregate_result", ["summary", "resampled"])
+
+# The running totals for one field of one job
+class field_totals:
+
+    def __init__(self, grid):
+        self.max = -np.inf
+        self.min = np.inf
+        self.sum = 0.0
+        self.count = 0
+        self.final = np.nan
+        if grid is not None:
+            self.resampled = np.full(len(grid), np.nan)
+
+    # @return the value of one of REDUCTIONS
+    def get(self, reduction):
+        if self.count == 0:
+            return np.nan
+        if reduction == "mean":
+            return self.sum / self.count
+        return getattr(self, reduction)
+
+# Fold one job's dataset into the reductions and the resampled curve a chunk at a time
+#
+# Runs on a worker, so it takes and returns plain values: task is (location, path, fields, reductions, grid,
+# time_range, chunk_rows), with fields None for every field but the time
+#
+# @return ({(field, reduction): value}, {field: values on the grid} or None), or None if it couldn't be read
+def reduce_dataset(task):
+    location, path, fields, reductions, grid, time_range, chunk_rows = task
+    try:
+        if fields is None:
+            with h5.File(location, 'r') as f:
+                fields = [name for name in f[path].dtype.names if name != hdf5reader.TIME_FIELD]
+        read_fields = list(fields)
+        if grid is not None and hdf5reader.TIME_FIELD not in read_fields:
+            read_fields.append(hdf5reader.TIME_FIELD)
+        totals = {field: field_totals(grid) for field in fields}
+
+        # The last row of the chunk before, so grid times between two chunks can be interpolated
+        previous = None
+        for chunk in hdf5reader.iter_dataset(location, path, read_fields, time_range=time_range, chunk_rows=chunk_rows):
+            if len(chunk) == 0:
+                continue
+            if grid is not None:
+                times = chunk[hdf5reader.TIME_FIELD]
+                if previous is not None:
+                    times = np.concatenate(([previous[hdf5reader.TIME_FIELD]], times))
+                inside = (grid >= times[0]) & (grid <= times[-1])
+            for field, total in totals.items():
+                values = chunk[field].astype(float)
+                total.max = max(total.max, values.max())
+                total.min = min(total.min, values.min())
+                total.sum += values.sum()
+                total.count += len(values)
+                total.final = values[-1]
+                if grid is not None and inside.any():
+                    if previous is not None:
+                        values = np.concatenate(([float(previous[field])], values))
+                    total.resampled[inside] = np.interp(grid[inside], times, values)
+            previous = chunk[-1]
+
+        reduced = {(field, reduction): total.get(reduction) for field, total in totals.items() for reduction in reductions}
+        resampled = {field: total.resampled for field, total in totals.items()} if grid is not None else None
+        return reduced, resampled
+    except Exception as e:
+        print("ERROR: could not aggregate " + location + path + ".\n\t" + repr(e))
+        return None
+
+# Read the dataset at path in file_name (e.g., "timehist.h5") from every job and reduce it
+#
+#   fields:         the columns to reduce (default: every one but the time)
+#   reductions:     any of REDUCTIONS, worked out for every field
+#   grid:           times to resample every field to (by linear interpolation), so the jobs' curves line up.
+#                   Times outside a job's data come out as NaN
+#   time_range:     (first, last) to only look at the rows with first <= time <= last
+#   executor:       the jobexecutor.job_executor to read with (default: a pool of processes just for this)
+#
+# Jobs whose file can't be read get NaN
+#
+# @return an aggregate_result
+def aggregate(jobs, file_name, path, fields=None, reductions=("max", "final"), grid=None, time_range=None,
+              executor=None, chunk_rows=hdf5reader.CHUNK_ROWS):
+    jobs = list(jobs)
+    for reduction in reductions:
+        if reduction not in REDUCTIONS:
+            raise ValueError("Unknown reduction \"" + str(reduction) + "\", pick from " + ", ".join(REDUCTIONS))
+    if grid is not None:
+        grid = np.asarray(grid, dtype=float)
+    tasks = [(job.directory_name + "/" + file_name, path, fields, tuple(reductions), grid, time_range, chunk_rows)
+             for job in jobs]
+
+    own_executor = executor is None
+    if own_executor:
+        executor = job_executor("process")
+    try:
+        results = list(executor.get_pool().map(reduce_dataset, tasks, chunksize=max(1, executor.chunk_size)))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    names = [job.folder_name for job in jobs]
+    summary = pd.DataFrame([result[0] if result is not None else dict() for result in results])
+    summary.columns = [field + " " + reduction for field, reduction in summary.columns]
+    summary.insert(0, 'Job Name', names)
+
+    resampled = None
+    if grid is not None:
+        columns = dict()
+        for name, result in zip(names, results):
+            if result is not None:
+                for field, values in result[1].items():
+                    columns[(field, name)] = values
+        resampled = pd.DataFrame(columns, index=pd.Index(grid, name=hdf5reader.TIME_FIELD))
+    return aggregate_result(summary, resampled)
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import numpy as np
+import pandas as pd
+import h5py as h5
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Readers for the HDF5 result files a Velodyne run writes (timehist.h5, simon.h5, deletion.h5), that never
+# pull more of a dataset into memory than you ask for
+#
+# Every function opens the file in a with block, so it's closed again as soon as the read's done, and takes:
+#
+#   fields:         the columns to read, e.g., ["time", "Force"] (default: all of them)
+#   start, stop:    a slice of rows, like dataset[start:stop]
+#   time_range:     (first, last) to only read the rows with first <= time <= last. The time column has to
+#                   be in order (it always is in a time history), so the rows are found with a binary search
+#                   that reads a few dozen single values instead of the whole column
+#
+# read_dataset() gives you everything you asked for as one numpy array, iter_dataset() and iter_frames()
+# hand it over chunk_rows rows at a time so a multi-GB file never has to fit in memory, and
+# memmap_dataset() maps the dataset straight from disk without reading any of it.
+
+# The datasets job.get_timehist(), get_simon() and get_deletion() read
+TIMEHIST_DATA = "/LoadCell/Lattice_Center/Data" # <---------------------------------------------------- EDIT
+SIMON_DATA = "/physical_quantities/Data" # <----------------------------------------------------------- EDIT
+DELETION_GROUP = "/Deletion" # <----------------------------------------------------------------------- EDIT
+
+# Rows read at a time by iter_dataset() and iter_frames()
+CHUNK_ROWS = 100000
+
+# The column time_range looks at
+TIME_FIELD = "time"
+
+# @return the first row whose time is >= value (or > value, if right is True), reading one value at a time
+def search_time(dataset, value, right=False):
+    times = dataset.fields(TIME_FIELD)
+    low, high = 0, dataset.shape[0]
+    while low < high:
+        middle = (low + high) // 2
+        if times[middle] < value or (right and times[middle] == value):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+# Work out which rows of dataset to read
+#
+# @return (first row, row after the last)
+def get_rows(dataset, start=None, stop=None, time_range=None):
+    start, stop, step = slice(start, stop).indices(dataset.shape[0])
+    if time_range is not None:
+        first, last = time_range
+        if first is not None:
+            start = max(start, search_time(dataset, first))
+        if last is not None:
+            stop = min(stop, search_time(dataset, last, right=True))
+    return start, max(start, stop)
+
+# @return dataset, or just the given fields of it
+def select_fields(dataset, fields=None):
+    if fields is None:
+        return dataset
+    return dataset.fields(list(fields))
+
+# Read part of a dataset (see the top of this file for the arguments)
+#
+# @return a numpy structured array
+def read_dataset(location, path, fields=None, start=None, stop=None, time_range=None):
+    with h5.File(location, 'r') as f:
+        dataset = f[path]
+        start, stop = get_rows(dataset, start, stop, time_range)
+        return select_fields(dataset, fields)[start:stop]
+
+# Read part of a dataset chunk_rows rows at a time (see the top of this file for the other arguments)
+#
+# The file stays open until the generator is used up or closed
+#
+# @return a generator of numpy structured arrays
+def iter_dataset(location, path, fields=None, start=None, stop=None, time_range=None, chunk_rows=CHUNK_ROWS):
+    with h5.File(location, 'r') as f:
+        dataset = f[path]
+        start, stop = get_rows(dataset, start, stop, time_range)
+        selected = select_fields(dataset, fields)
+        for first in range(start, stop, chunk_rows):
+            yield selected[first:min(first + chunk_rows, stop)]
+
+# iter_dataset(), as DataFrames
+#
+# @return a generator of pandas DataFrames
+def iter_frames(location, path, fields=None, start=None, stop=None, time_range=None, chunk_rows=CHUNK_ROWS):
+    for chunk in iter_dataset(location, path, fields, start, stop, time_range, chunk_rows):
+        yield pd.DataFrame(chunk)
+
+# Map a dataset straight from the file, so rows are only read from disk when you look at them
+#
+# Only works for datasets stored in one contiguous, uncompressed block (which is how the result files are
+# written). The map stays usable after the file's closed, since it's on the file itself and not h5py.
+#
+# @return a read-only numpy memmap of the whole dataset, or None if it can't be mapped
+def memmap_dataset(location, path):
+    with h5.File(location, 'r') as f:
+        dataset = f[path]
+        offset = dataset.id.get_offset()
+        if (offset is None or dataset.chunks is not None or dataset.compression is not None or
+                dataset.id.get_type().get_size() != dataset.dtype.itemsize):
+            return None
+        dtype, shape = dataset.dtype, dataset.shape
+    if shape[0] == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(location, mode='r', dtype=dtype, offset=offset, shape=shape)
+
+# @return the names of the groups under path (e.g., the reasons in deletion.h5's /Deletion)
+def list_groups(location, path):
+    with h5.File(location, 'r') as f:
+        return list(f[path].keys())
+
+# Read the dataset called name in every group under path (e.g., every reason's Data in deletion.h5's
+# /Deletion) into one array, opening the file once
+#
+# The rows each group's going to give are worked out first, so the array's allocated once at its full size
+# and every group's read straight into its part of it instead of being stacked up afterwards. The groups
+# should have the same columns as the first one, in any order.
+#
+# @return (numpy structured array, which group each row came from as an index into groups, groups)
+def read_groups(location, path, name, groups=None, fields=None, time_range=None):
+    with h5.File(location, 'r') as f:
+        if groups is None:
+            groups = list(f[path].keys())
+        datasets = [f[path + "/" + group + "/" + name] for group in groups]
+        rows = [get_rows(dataset, time_range=time_range) for dataset in datasets]
+        counts = np.array([stop - start for start, stop in rows], dtype=np.int64)
+        if len(datasets) == 0:
+            return np.zeros(0, dtype=[(TIME_FIELD, "f8")]), np.zeros(0, dtype=np.int64), groups
+
+        dtype = select_fields(datasets[0], fields)[0:0].dtype
+        data = np.empty(counts.sum(), dtype=dtype)
+        position = 0
+        for dataset, (start, stop), count in zip(datasets, rows, counts):
+            chunk = select_fields(dataset, fields)[start:stop]
+            if chunk.dtype == dtype:
+                data[position:position + count] = chunk
+            else:
+                for field in dtype.names:
+                    data[field][position:position + count] = chunk[field]
+            position += count
+    return data, np.repeat(np.arange(len(groups)), counts), groups
+
+# Sum up the dataset called name in every group under path without reading it: how many rows it has and the
+# times in its first and last rows (NaN if it's empty)
+#
+# @return a list of (group, rows, first time, last time)
+def summarize_groups(location, path, name, groups=None):
+    with h5.File(location, 'r') as f:
+        if groups is None:
+            groups = list(f[path].keys())
+        summary = list()
+        for group in groups:
+            dataset = f[path + "/" + group + "/" + name]
+            count = dataset.shape[0]
+            if count == 0:
+                summary.append((group, 0, np.nan, np.nan))
+                continue
+            times = dataset.fields(TIME_FIELD)
+            summary.append((group, count, times[0], times[count - 1]))
+    return summary
+
+# ----------------------------------------------------------------------------------------------------------- #
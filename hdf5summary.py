@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from contextlib import closing
+
+# Import custom scripts
+import hdf5reader
+import hdf5aggregate
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# A store of summaries of every run's HDF5 result files (peak load, final energy, how many elements were
+# deleted, ...), so a dashboard or a sweep comparison can answer those without opening timehist.h5, simon.h5
+# and deletion.h5 again
+#
+#   store = hdf5summary.summary_store()
+#   store.get_table(jobs)       one row per job: Job Name, "Force max", "Kinetic Energy final", "Deletions", ...
+#   job.get_summary(store)      {"Force max": ..., ...} for one job
+#
+# The summaries live in one SQLite file for all the runs, along with the (size, mtime) each file had when it
+# was summed up. A file's only read again once its size or mtime changes (i.e., while the run's still writing
+# it), so after the first pass over a finished sweep, asking for its summaries never touches its HDF5 files.
+
+# Where we keep the summaries between runs
+SUMMARY_LOCATION = "/beegfs/interns/esnell/Unit_Cells/.hdf5_summaries.sqlite" # <------------------- EDIT LOCATION
+
+# Bump this whenever what's summed up changes, so old summaries get thrown out instead of mixed in
+SUMMARY_VERSION = 1
+
+# The files we sum up and the dataset (or, for deletion.h5, the group of datasets) in each
+SUMMARY_FILES = {"timehist.h5": hdf5reader.TIMEHIST_DATA,
+                 "simon.h5": hdf5reader.SIMON_DATA,
+                 "deletion.h5": hdf5reader.DELETION_GROUP}
+
+# What we work out for every column of timehist.h5 and simon.h5 (see hdf5aggregate.REDUCTIONS)
+SUMMARY_REDUCTIONS = ("max", "min", "final")
+
+# Sum up one HDF5 result file
+#
+#   timehist.h5, simon.h5:  "<column> <reduction>" for every column but the time, read a chunk at a time
+#   deletion.h5:            "Deletions", "<reason> Deletions", and the "First Deletion" and "Last Deletion"
+#                           times, from only the size and first and last rows of each reason's dataset
+#
+# Lives at module level so a process pool can send it to its workers: task is (file location, file name)
+#
+# @return {name: value}, or None if the file couldn't be read
+def summarize_file(task):
+    location, file_name = task
+    if file_name == "deletion.h5":
+        try:
+            reasons = hdf5reader.summarize_groups(location, SUMMARY_FILES[file_name], "Data")
+        except Exception as e:
+            print("ERROR: could not summarize " + location + ".\n\t" + repr(e))
+            return None
+        summary = {reason + " Deletions": float(count) for reason, count, first, last in reasons}
+        summary["Deletions"] = float(sum(count for reason, count, first, last in reasons))
+        firsts = [first for reason, count, first, last in reasons if count > 0]
+        lasts = [last for reason, count, first, last in reasons if count > 0]
+        summary["First Deletion"] = float(min(firsts)) if len(firsts) > 0 else np.nan
+        summary["Last Deletion"] = float(max(lasts)) if len(lasts) > 0 else np.nan
+        return summary
+
+    reduced = hdf5aggregate.reduce_dataset((location, SUMMARY_FILES[file_name], None, SUMMARY_REDUCTIONS, None, None,
+                                            hdf5reader.CHUNK_ROWS))
+    if reduced is None:
+        return None
+    return {field + " " + reduction: float(value) for (field, reduction), value in reduced[0].items()}
+
+class summary_store:
+
+    def __init__(self, location=SUMMARY_LOCATION, rebuild=False):
+        self.location = location
+        # Finished jobs whose files we've already checked, which can't change anymore (see refresh())
+        self.settled = set()
+        self.create(rebuild)
+
+    # @return a connection to the store, that waits for other processes' writes instead of giving up
+    def connect(self):
+        return closing(sqlite3.connect(self.location, timeout=60))
+
+    # Make the tables if they aren't there yet, starting over if they're from an older version
+    def create(self, rebuild=False):
+        with self.connect() as connection, connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if rebuild or version != SUMMARY_VERSION:
+                if not rebuild and version != 0:
+                    print("    > HDF5 summaries at " + self.location + " are out of date, rebuilding them.")
+                connection.execute("DROP TABLE IF EXISTS files")
+                connection.execute("DROP TABLE IF EXISTS summaries")
+            connection.execute("CREATE TABLE IF NOT EXISTS files (directory TEXT, file_name TEXT, size INTEGER, "
+                               "mtime REAL, PRIMARY KEY (directory, file_name))")
+            connection.execute("CREATE TABLE IF NOT EXISTS summaries (directory TEXT, file_name TEXT, name TEXT, "
+                               "value REAL, PRIMARY KEY (directory, file_name, name))")
+            connection.execute("PRAGMA user_version = " + str(SUMMARY_VERSION))
+
+    # @return {file name: (size, mtime) or None if it's not there} for the job's HDF5 result files, from its
+    #         run_snapshot if it still has one
+    def get_fingerprints(self, job):
+        fingerprints = dict()
+        for file_name in SUMMARY_FILES:
+            if job.snapshot is not None:
+                fingerprints[file_name] = job.snapshot.get_stat(file_name)
+                continue
+            try:
+                stat = os.stat(job.directory_name + "/" + file_name)
+                fingerprints[file_name] = (stat.st_size, stat.st_mtime)
+            except FileNotFoundError:
+                fingerprints[file_name] = None
+        return fingerprints
+
+    # Sum up whichever of the jobs' HDF5 files changed since we last did, and drop the ones that are gone
+    #
+    # The stale files are read here one after another, or on executor's pool (a jobexecutor.job_executor) if
+    # you pass one in. A file that can't be read (e.g., one the run's halfway through writing) is left out and
+    # tried again next time.
+    #
+    # Once a finished job's files have been checked, this store doesn't look at them again, so refreshing
+    # every pass (e.g., in watch mode) only costs a few stats per running job.
+    def refresh(self, jobs, executor=None):
+        with self.connect() as connection:
+            stored = {(directory, file_name): (size, mtime) for directory, file_name, size, mtime
+                      in connection.execute("SELECT directory, file_name, size, mtime FROM files")}
+        stale = list()
+        gone = list()
+        checked = list()
+        for job in jobs:
+            if job.directory_name in self.settled:
+                continue
+            if job.is_finished():
+                checked.append(job.directory_name)
+            for file_name, fingerprint in self.get_fingerprints(job).items():
+                key = (job.directory_name, file_name)
+                if fingerprint is None:
+                    if key in stored:
+                        gone.append(key)
+                elif stored.get(key) != tuple(fingerprint):
+                    stale.append(key + tuple(fingerprint))
+        if len(stale) == 0 and len(gone) == 0:
+            self.settled.update(checked)
+            return
+
+        tasks = [(directory + "/" + file_name, file_name) for directory, file_name, size, mtime in stale]
+        if executor is None:
+            results = [summarize_file(task) for task in tasks]
+        else:
+            results = list(executor.get_pool().map(summarize_file, tasks, chunksize=max(1, executor.chunk_size)))
+
+        with self.connect() as connection, connection:
+            for directory, file_name in gone + [(directory, file_name) for directory, file_name, size, mtime in stale]:
+                connection.execute("DELETE FROM files WHERE directory = ? AND file_name = ?", (directory, file_name))
+                connection.execute("DELETE FROM summaries WHERE directory = ? AND file_name = ?", (directory, file_name))
+            for (directory, file_name, size, mtime), summary in zip(stale, results):
+                if summary is None:
+                    continue
+                connection.execute("INSERT INTO files VALUES (?, ?, ?, ?)", (directory, file_name, size, mtime))
+                connection.executemany("INSERT INTO summaries VALUES (?, ?, ?, ?)",
+                                       [(directory, file_name, name, value) for name, value in summary.items()])
+        failed = set(directory for (directory, file_name, size, mtime), summary in zip(stale, results) if summary is None)
+        self.settled.update(directory for directory in checked if directory not in failed)
+
+    # @return {name: value} of every summary of the job's HDF5 files, refreshing them first
+    def get(self, job):
+        self.refresh([job])
+        with self.connect() as connection:
+            return {name: value if value is not None else np.nan for name, value
+                    in connection.execute("SELECT name, value FROM summaries WHERE directory = ?", (job.directory_name,))}
+
+    # Every job's summaries as a table, refreshing them first (see refresh() for executor)
+    #
+    # @return a DataFrame with a row per job: Job Name, then a column per summary (NaN where a job doesn't have it)
+    def get_table(self, jobs, executor=None):
+        jobs = list(jobs)
+        self.refresh(jobs, executor)
+        with self.connect() as connection:
+            summaries = pd.read_sql_query("SELECT directory, name, value FROM summaries", connection)
+        directories = [job.directory_name for job in jobs]
+        summaries = summaries[summaries['directory'].isin(directories)]
+        table = summaries.pivot(index='directory', columns='name', values='value').reindex(directories)
+        table.columns.name = None
+        table.insert(0, 'Job Name', [job.folder_name for job in jobs])
+        return table.reset_index(drop=True)
+
+# ----------------------------------------------------------------------------------------------------------- #
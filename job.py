@@ -4,17 +4,142 @@
 # Import general libraries
 import os
 import re
-import h5py as h5
 import numpy as np
 import pandas as pd
 from functools import total_ordering
+from collections import namedtuple
 from datetime import datetime, timedelta, time
 
+# Import custom scripts
+import tracing
+import hdf5reader
+from runsnapshot import run_snapshot
+from timestepprogress import timestep_progress
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# We read files backwards in blocks of this many bytes when tailing them
+#
+# Every block is one seek + read, which is a full round trip on BeeGFS, so keep this big
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# Return the last N lines of a file without reading the whole thing
+#
+# We start at the end of the file and read backwards in TAIL_BLOCK_SIZE blocks until we've seen enough
+# newlines. The first read is the partial block at the end of the file, so every read after it lands on a
+# block boundary. The bytes are only decoded once, after we've cut them down to the last N lines.
+#
+# A newline at the very end of the file doesn't count as an extra empty line, a missing one is fine,
+# and "\r\n" line endings are stripped the same as "\n"
+#
+# @return a list of the last N lines (str), oldest first, without line endings
+def tail_lines(file_name, N, block_size=TAIL_BLOCK_SIZE):
+    if N <= 0:
+        return list()
+    blocks = list()
+    with open(file_name, 'rb') as read_obj:
+        pointer_location = read_obj.seek(0, os.SEEK_END)
+        read_size = pointer_location % block_size or block_size
+        newlines_needed = None
+        newlines_found = 0
+        while pointer_location > 0:
+            read_size = min(read_size, pointer_location)
+            pointer_location = pointer_location - read_size
+            read_obj.seek(pointer_location)
+            block = read_obj.read(read_size)
+            if newlines_needed is None:
+                # A final newline ends the last line, so we need one more to be sure the first line is whole
+                newlines_needed = N + 1 if block.endswith(b'\n') else N
+            blocks.append(block)
+            newlines_found = newlines_found + block.count(b'\n')
+            if newlines_found >= newlines_needed:
+                break
+            read_size = block_size
+    if len(blocks) == 0:
+        return list()
+    data = b''.join(reversed(blocks))
+    if data.endswith(b'\n'):
+        data = data[:-1]
+    data = b'\n'.join(data.split(b'\n')[-N:])
+    return [line.rstrip('\r') for line in data.decode(errors='replace').split('\n')]
+
+# How many lines from the end of the output file we look through for terminal state codes
+OUTPUT_TAIL_LINES = 15
+
+# A terminal state we can spot in the tail of a job's output file
+#
+# state:        the label that shows up in the "Remaining" column (e.g. "COMPLETE", "CANCELED")
+# pattern:      the regex to look for, compiled once here instead of on every search
+# time_group:   the match group holding the time the job ended, if the line has one
+class output_detector:
+    def __init__(self, state, pattern, time_group=None):
+        self.state = state
+        self.pattern = re.compile(pattern)
+        self.time_group = time_group
+
+    # @return None if the line doesn't match, otherwise the end time (str) from the line, or "" if it doesn't have one
+    def detect(self, line):
+        match = self.pattern.search(line)
+        if not match:
+            return None
+        if self.time_group is None:
+            return ""
+        return match.group(self.time_group).replace("T", " ")
+
+# Add a new terminal state to look for in every job's output file
+#
+# Detectors are checked in order and the first one that matches decides the job's state, so a new
+# detector goes in front of the built-in ones unless you ask for it to go last
+def register_output_detector(state, pattern, time_group=None, last=False):
+    detector = output_detector(state, pattern, time_group)
+    if last:
+        job.output_detectors.append(detector)
+    else:
+        job.output_detectors.insert(0, detector)
+    return detector
+
+# @return every state label our output detectors can give a job, in order of precedence
+def get_terminal_states():
+    return [detector.state for detector in job.output_detectors]
+
+# The state of a job that hasn't reached a terminal state yet
+RUNNING_STATE = "RUNNING"
+
+# One job's row of the status table, as plain values--getstatuses.get_status_table() turns a list of
+# these into the whole table at once
+#
+# remaining is None once the job has finished, and status is RUNNING_STATE or the terminal state it ended in.
+# The description isn't in here, so building the table never has to parse it (see job.description).
+status_record = namedtuple("status_record", ["HPC_code", "job_name", "percent", "start_time", "elapsed",
+                                             "remaining", "end_time", "status"])
+
 # ----------------------------------------------------------------------------------------------------------- #
 
+# Turn a tuple from job.pack() back into a job, without touching any of its files
+#
+# The job has no run_snapshot until the next refresh() gives it one
+def unpack_job(packed):
+    new_job = job.__new__(job)
+    for name, value in zip(PACKED_SLOTS, packed):
+        setattr(new_job, name, value)
+    new_job.snapshot = None
+    return new_job
+
 @total_ordering
 class job:
 
+    # Every terminal state we look for in the output file, in order of precedence
+    #
+    # A Slurm time limit kill also matches the cancellation pattern, so TIMEOUT has to come before CANCELED,
+    # and any kill wins over a completion code
+    output_detectors = [
+        output_detector("TIMEOUT", r'slurmstepd: error: \*\*\* (.*)ON (.*) CANCELLED AT (\S+) DUE TO TIME LIMIT', 3),
+        output_detector("CANCELED", r'slurmstepd: error: \*\*\* (.*)ON compute(.*) CANCELLED AT (\S+)(.*) \*\*\*', 3),
+        output_detector("OOM", r'oom-kill|oom_kill|[Oo]ut [Oo]f [Mm]emory'),
+        output_detector("SEGFAULT", r'Segmentation fault|SIGSEGV|signal 11\b'),
+        output_detector("COMPLETE", r'Total Computation Time:.*[+-]?(?:0|[1-9]\d*)(?:\.\d*)?(?:[eE][+\-]?\d+)'),
+    ]
+
     # Enable comparisons between jobs
     #
     # If you want it to compare based on something other than folder name,
@@ -26,73 +151,145 @@ class job:
             return NotImplemented
         return ((self.folder_name < other.folder_name))
 
+    # Everything a job keeps, in slots instead of a per-instance __dict__--a big tree has tens of thousands of
+    # jobs, in memory, in the status cache and coming back from worker processes
+    #
+    # The ones starting with _ are worked out the first time they're asked for, see the properties below
+    __slots__ = ("snapshot", "folder_name", "directory_name", "output_file", "HPC_code", "fingerprints",
+                 "completed", "canceled", "cancellation_time", "output_states", "terminal_state", "timestep_times",
+                 "timestep_progress", "start_real_time", "elapsed", "time_finished", "current_deformation",
+                 "_description", "_duration", "_timing_data")
+
     # Initialize all relevant instance variables
-    def __init__(self):
+    #
+    # directory is the path of the Velodyne run folder. Pass in a run_snapshot of it if you already have one,
+    # otherwise we take one here. Everything we need to know about the folder's contents comes from it.
+    #
+    # Only what the snapshot already tells us is set here. The description, duration and timing data are
+    # read from the run's files the first time something asks for them, so e.g. a listing that only needs
+    # names and states never parses the description out of the velodyne card.
+    def __init__(self, directory, snapshot=None):
+        if snapshot is None:
+            snapshot = run_snapshot(directory)
+        self.snapshot = snapshot
     
         # Pull the:
-        # 1) folder name, from os.getcwd()
-        # 2) directory name, from os.getcwd()
-        # 3) description, from the velodyne card --- UNUSED ---
-        # 4) output file, from whatever most recent .o###### file there is
-        # 5) run duration, from the velodyne card
+        # 1) folder name, from the snapshot
+        # 2) directory name, from the snapshot
+        # 3) output file, from whatever most recent .o###### file there is
+        # 4) HPC code, from the output file's extension
         self.folder_name = self.set_folder_name()
         self.directory_name = self.set_directory_name()
-        self.description = self.get_description()
         self.output_file = self.set_output_file()
-        self.duration = self.get_duration()
+        self.HPC_code = self.get_HPC_code()
 
         # Set up timing information:
         #
-        # We initialize everything to None / False and then use get_timing_data()
-        # to set all our values correctly
+        # We initialize everything to None / False and then get_timing_data()
+        # sets all our values correctly the first time timing_data is asked for
         self.completed = False
         self.canceled = False
         self.cancellation_time = None
+        self.output_states = None
+        self.terminal_state = None
+        self.timestep_times = None
+        self.timestep_progress = None
         self.start_real_time = None
         self.elapsed = None
         self.time_finished = None
         self.current_deformation = None
-        self.HPC_code = None
-        self.timing_data = self.get_timing_data()
+        self._description = None
+        self._duration = None
+        self._timing_data = None
+
+        # Remember what the files we parsed looked like, so the status cache can tell what changed
+        self.fingerprints = self.get_fingerprints()
+
+    # The description written in the velodyne card, see get_description()
+    @property
+    def description(self):
+        if self._description is None:
+            with tracing.span("card", directory=self.directory_name):
+                self._description = self.get_description()
+        return self._description
+
+    # The run duration from the velodyne card, see get_duration()
+    @property
+    def duration(self):
+        if self._duration is None:
+            with tracing.span("card", directory=self.directory_name):
+                self._duration = self.get_duration()
+        return self._duration
+
+    # The job's row of the status table, see get_timing_data()
+    @property
+    def timing_data(self):
+        if self._timing_data is None:
+            self._timing_data = self.get_timing_data()
+        return self._timing_data
+
+    # Open HDF5 files can't be pickled, so they're left behind when a job goes into the status cache or
+    # comes back from a worker process
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    # The compact form a job travels in between processes (see jobexecutor.py): a plain tuple of everything in
+    # PACKED_SLOTS, without the run_snapshot--it's the biggest part of a job and only needed to build or
+    # refresh one, which the worker already did
+    #
+    # @return a tuple, turn it back into a job with unpack_job()
+    def pack(self):
+        return tuple([getattr(self, name) for name in PACKED_SLOTS])
+
+    # @return True if the job has reached a terminal state (COMPLETE, CANCELED, TIMEOUT, ...) and won't change again
+    def is_finished(self):
+        return self.get_terminal_state() is not None
+
+    # The files we parse, fingerprinted by name, size and mtime from our run_snapshot
+    #
+    # @return a dict of {"card", "output", "timestep": (file name, size, mtime) or None}
+    def get_fingerprints(self):
+        fingerprints = dict()
+        for key, file_name in (("card", "velodyne.card"),
+                               ("output", self.snapshot.get_latest_output_file()),
+                               ("timestep", self.snapshot.get_latest_timestep())):
+            stat = self.snapshot.get_stat(file_name) if file_name is not None else None
+            fingerprints[key] = (file_name,) + stat if stat is not None else None
+        return fingerprints
+
+    # Bring a job from the status cache up to date with a new snapshot of its run folder
+    #
+    # Only the files whose fingerprint changed since we last looked get parsed again
+    #
+    # @return True if anything changed
+    def refresh(self, snapshot):
+        self.snapshot = snapshot
+        old_fingerprints = self.fingerprints
+        self.fingerprints = self.get_fingerprints()
+        if self.fingerprints == old_fingerprints:
+            return False
+        if self.fingerprints["card"] != old_fingerprints["card"]:
+            self._description = None
+            self._duration = None
+        if self.fingerprints["output"] != old_fingerprints["output"]:
+            self.output_file = self.set_output_file()
+            self.HPC_code = self.get_HPC_code()
+            self.output_states = None
+            self.terminal_state = None
+            self.cancellation_time = None
+        if self.fingerprints["timestep"] != old_fingerprints["timestep"]:
+            self.timestep_times = None
+        self._timing_data = None
+        return True
                    
-    # METHOD BORROWED FROM https://thispointer.com/python-get-last-n-lines-of-a-text-file-like-tail-command/
+    # Return the last N lines of a file, see tail_lines() above
     # Very important to use this to keep memory accesses minimal
     def get_last_n_lines(self, file_name, N):
-        # Create an empty list to keep the track of last N lines
-        list_of_lines = []
-        # Open file for reading in binary mode
-        with open(file_name, 'rb') as read_obj:
-            # Move the cursor to the end of the file
-            read_obj.seek(0, os.SEEK_END)
-            # Create a buffer to keep the last read line
-            buffer = bytearray()
-            # Get the current position of pointer i.e eof
-            pointer_location = read_obj.tell()
-            # Loop till pointer reaches the top of the file
-            while pointer_location >= 0:
-                # Move the file pointer to the location pointed by pointer_location
-                read_obj.seek(pointer_location)
-                # Shift pointer location by -1
-                pointer_location = pointer_location -1
-                # read that byte / character
-                new_byte = read_obj.read(1)
-                # If the read byte is new line character then it means one line is read
-                if new_byte == b'\n':
-                    # Save the line in list of lines
-                    list_of_lines.append(buffer.decode()[::-1])
-                    # If the size of list reaches N, then return the reversed list
-                    if len(list_of_lines) == N:
-                        return list(reversed(list_of_lines))
-                    # Reinitialize the byte array to save next line
-                    buffer = bytearray()
-                else:
-                    # If last read character is not eol then add it in buffer
-                    buffer.extend(new_byte)
-            # As file is read completely, if there is still data in buffer, then its first line.
-            if len(buffer) > 0:
-                list_of_lines.append(buffer.decode()[::-1])
-        # return the reversed list
-        return list(reversed(list_of_lines))
+        return tail_lines(file_name, N)
                   
     # METHOD BORROWED FROM https://stackoverflow.com/questions/18422127/python-read-text-file-from-second-line-to-fifteenth
     # Very important to use this to keep memory accesses minimal
@@ -105,10 +302,10 @@ class job:
         return list_of_lines
     
     def set_folder_name(self):
-        return os.getcwd().split("/")[-1:][0]
+        return self.snapshot.directory.rstrip("/").split("/")[-1:][0]
     
     def set_directory_name(self):
-        return os.getcwd()
+        return self.snapshot.directory
     
     # To get the description, we look only at the first 25 lines of the velodyne card
     # If it's not working, increase this to > 25 lines
@@ -188,220 +385,286 @@ class job:
     #
     # @return the file location of our most recent .o file
     def set_output_file(self):
-        try:
-            files = os.listdir()
-            output_files = list()
-            extensions = list()
-            for file in files:
-                if re.search(".o\d+",file):
-                    output_files.append(file)
-                    extensions.append(int(file[-6:])) ## for a presumed 6 digit job code
-            return [file for file in output_files if str(max(extensions)) in file][0]
-        except Exception as e:
-            print("ERROR output file not found: \n\t> " + str(e))
+        output_file = self.snapshot.get_latest_output_file()
+        if output_file is None:
+            print("ERROR output file not found: \n\t> no .o###### files in " + self.snapshot.directory)
+        return output_file
     
     # This will pull our HPC code, which is just the digits at the end of our output file
     def get_HPC_code(self):
-        try:
-            files = os.listdir()
-            output_files = list()
-            extensions = list()
-            for file in files:
-                if re.search(".o\d+",file):
-                    output_files.append(file)
-                    extensions.append(int(file[-6:])) ## for a presumed 6 digit job code
-            return max(extensions)
-        except Exception as e:
-            print("ERROR output file not found: \n\t> " + str(e))
+        HPC_code = self.snapshot.get_HPC_code()
+        if HPC_code is None:
+            print("ERROR output file not found: \n\t> no .o###### files in " + self.snapshot.directory)
+        return HPC_code
     
     # Here we pull in our timing information from our most recent status.timestep file
     #
+    # Only the rows written since we last looked are read (and for a finished job, only the first and last
+    # rows), see timestepprogress.py
+    #
     # @return current_rt:   current real time, as a DateTime object
     #         start_time:   start real time, as a DateTime object
     #         timestep:     the current timestep, as a float
     #
     def get_current_start_timestep_times(self):
-        file_path = self.directory_name + "/" + self.get_recent_timestep()
-        #print("Searching " + file_path + " for runtime information...")
-        first_lines = self.get_first_n_lines(file_path, 2) ## returns lines 0 and 1, which are the labels and first row respectively
-        last_line = self.get_last_n_lines(file_path, 2)[0]
-        
-        start_real_time = " ".join(first_lines[1].split()[0:2]).replace(",","")
-        current_real_time = " ".join(last_line.split()[0:2]).replace(",","")
-        timestep = float(last_line.split()[3].replace(",","")) 
-                
-        start_rt = datetime.strptime(start_real_time, '%Y/%m/%d %H:%M:%S')
-        current_rt = datetime.strptime(current_real_time, '%Y/%m/%d %H:%M:%S')
-        return (current_rt, start_rt, timestep)
+        file_name = self.get_recent_timestep()
+        size, mtime = self.snapshot.get_stat(file_name)
+        if self.timestep_progress is None:
+            self.timestep_progress = timestep_progress()
+        self.timestep_progress.update(self.directory_name + "/" + file_name, size, mtime,
+                                      finished=self.get_terminal_state() is not None)
+        return self.timestep_progress.get_times()
+    
+    # Same as get_current_start_timestep_times(), but only reads the file the first time we ask
+    # (or after refresh() notices it changed)
+    def get_timestep_times(self):
+        if self.timestep_times is None:
+            with tracing.span("timestep", directory=self.directory_name):
+                self.timestep_times = self.get_current_start_timestep_times()
+        return self.timestep_times
     
     # Find the most recent timestep file
     def get_recent_timestep(self):
-        files = os.listdir()
-        timestep_files = [f for f in files if "status.timestep" in f]
-        return max(timestep_files)
+        return self.snapshot.get_latest_timestep()
     
+    # How the run's doing from the recent rows of status.timestep: the throughput (simulated seconds per wall
+    # second), the time remaining and end time at that throughput, and whether it's stalled
+    #
+    # now is the time to check for a stall against, in seconds since the epoch (default: now)
+    #
+    # @return a timestepprogress.timestep_estimate
+    def get_progress(self, now=None):
+        self.get_timestep_times()
+        return self.timestep_progress.get_estimate(self.duration, now)
+    
+    # Read the last OUTPUT_TAIL_LINES lines of the output file once and run every one of our
+    # output_detectors over them
+    #
+    # The result is cached on the job, so is_completed(), is_canceled() and get_terminal_state()
+    # all share a single read of the file
+    #
+    # @return a dict of {state: end time (str, "" if unknown)} for every detector that matched
+    def inspect_output_file(self):
+        if self.output_states is None:
+            states = dict()
+            with tracing.span("output_tail", directory=self.directory_name):
+                try:
+                    file_name = self.directory_name + "/" + self.output_file
+                    for line in self.get_last_n_lines(file_name, OUTPUT_TAIL_LINES):
+                        for detector in self.output_detectors:
+                            if detector.state not in states:
+                                found = detector.detect(line)
+                                if found is not None:
+                                    states[detector.state] = found
+                except Exception as e:
+                    print(e)
+            self.output_states = states
+
+            # The first detector (in order of precedence) that matched decides how the job ended
+            for detector in self.output_detectors:
+                if detector.state in states:
+                    self.terminal_state = detector.state
+                    if states[detector.state]:
+                        self.cancellation_time = states[detector.state]
+                    break
+            self.completed = self.terminal_state == "COMPLETE"
+            self.canceled = "CANCELED" in states
+        return self.output_states
+
+    # @return the state the job ended in (e.g. "COMPLETE", "CANCELED", "TIMEOUT"), or None if it's still running
+    def get_terminal_state(self):
+        self.inspect_output_file()
+        return self.terminal_state
+
     # Look for a completion code in the output file
     # Here we look for the key words "Total Computation Time:" in the last 15 lines of the output file
     #
     # @return a boolean (finished vs. unfinished)
     def is_completed(self):
-        if self.completed == False:
-            try:
-                file_name = self.directory_name + "/" + self.output_file
-                lines = self.get_last_n_lines(file_name, 15)
-                found_completion_code = False
-                for line in lines:
-                    if "Total Computation Time:" in line:
-                        try:
-                            total_comp_time = str(re.search('[+-]?(?:0|[1-9]\d*)(?:\.\d*)?(?:[eE][+\-]?\d+)', line).group(0))
-                            if total_comp_time is not None:
-                                found_completion_code = True
-                                break
-                        except Exception as e:
-                            print("ERROR: " + str(e))
-                if found_completion_code:
-                    self.completed = True
-                return found_completion_code
-            except Exception as e:
-                print(e)
-        else:
-            return True
-    
+        return "COMPLETE" in self.inspect_output_file()
+
     # Look for a cancellation code in the output file
     # Here we look for the key words "slurmstepd: error: \*\*\* (.*)ON compute(.*) CANCELLED AT (.*)" 
     # in the last 15 lines of the output file
     #
     # @return a boolean (canceled vs. uncanceled)
     def is_canceled(self):
-        if self.canceled == False:
-            try:
-                file_name = self.directory_name + "/" + self.output_file
-                last_lines = self.get_last_n_lines(file_name, 15)
-                for line in last_lines:
-                    match = re.search(r'slurmstepd: error: \*\*\* (.*)ON compute(.*) CANCELLED AT (.*) \*\*\*', line)
-                    found_cancellation_code = bool(match)
-                    if found_cancellation_code:
-                        cancellation_time = match.group(3).replace("T", " ")
-                        self.cancellation_time = cancellation_time
-                        self.cancelled = True
-                        break
-                return found_cancellation_code
-            except Exception as e:
-                print(e)
-        else:
-            return True
+        return "CANCELED" in self.inspect_output_file()
     
-    # Return a pandas DataFrame with relevant job tracking information
+    # Return the job's row of the status table
     #
-    # columns=['HPC Code', 'Job Name','Percent','Start Time','Elapsed','Remaining','End Time','Description']
+    # Building a DataFrame per job (and concatenating thousands of them) was most of the time spent on a big
+    # tree, so this is just a status_record and getstatuses.get_status_table() builds the table in one go
     #
-    # @return a pandas DataFrame
+    # @return a status_record
     #
     def get_timing_data(self):
-        df = pd.DataFrame(columns=['HPC Code', 'Job Name','Percent','Start Time','Elapsed','Remaining','End Time','Description'])
-        # As far as I'm aware, this case will never happen if we initialize the job from scratch each time
-        if self.completed and not self.canceled:
-            df.loc[0] = [self.HPC_code, self.folder_name, 100.00, self.start_real_time, self.elapsed, "COMPLETE", self.time_finished, self.description]
-        else:
-            # Pull in data from get_current_start_timestep_times()
-            times = self.get_current_start_timestep_times()
-            current_real_time = times[0]
-            start_real_time = times[1]
-            timestep = times[2]
-            
-            # Initialize self.start_real_time
-            self.start_real_time = start_real_time
-            
-            # Extrapolate when we think the job will be complete
-            elapsed_time = current_real_time - start_real_time
-            percent = timestep / self.duration * 100
+        # Finished jobs come straight out of the status cache without getting here (see statuscache.py),
+        # so this is only ever run for new jobs and jobs whose files changed since the last scan
+        #
+        # Pull in data from get_current_start_timestep_times()
+        times = self.get_timestep_times()
+        current_real_time = times[0]
+        start_real_time = times[1]
+        timestep = times[2]
+        
+        # Initialize self.start_real_time
+        self.start_real_time = start_real_time
+        
+        # Work out when we think the job will be complete from how fast it's been going lately, or, until
+        # there's enough of status.timestep for that, by extrapolating from the start
+        elapsed_time = current_real_time - start_real_time
+        percent = timestep / self.duration * 100
+        time_remaining = self.timestep_progress.get_estimate(self.duration).remaining
+        if time_remaining is None:
             time_remaining = (elapsed_time / (percent / 100)) - elapsed_time
-            end_time = time_remaining + current_real_time
-            
-            # Initialize our HPC code
-            self.HPC_code = self.get_HPC_code()
-            
-            # Update whether we think the run is completed, canceled, or still going
-            is_completed = self.is_completed()
-            is_canceled = self.is_canceled()
-            
-            # Return values based on the job status
-            if is_completed and not is_canceled:
-                self.elapsed = elapsed_time
-                self.time_finished = current_real_time
-                df.loc[0] = [self.HPC_code, self.folder_name, 100.00, self.start_real_time, self.elapsed, "COMPLETE", self.time_finished, self.description]
-            elif is_canceled:
-                self.elapsed = elapsed_time
-                self.time_finished = current_real_time
-                df.loc[0] = [self.HPC_code, self.folder_name, percent, self.start_real_time, self.elapsed, "CANCELED", self.cancellation_time, self.description]
-            else:
-                self.elapsed = elapsed_time
-                self.time_finished = end_time
-                df.loc[0] = [self.HPC_code, self.folder_name, percent, self.start_real_time, elapsed_time, time_remaining, end_time, self.description]
-        return(df)
+        end_time = time_remaining + current_real_time
+        
+        # Update whether we think the run is completed, canceled, killed, or still going
+        terminal_state = self.get_terminal_state()
+        
+        # Return values based on the job status
+        if terminal_state == "COMPLETE":
+            self.elapsed = elapsed_time
+            self.time_finished = current_real_time
+            record = status_record(self.HPC_code, self.folder_name, 100.00, self.start_real_time, self.elapsed, None,
+                                   self.time_finished, terminal_state)
+        elif terminal_state is not None:
+            self.elapsed = elapsed_time
+            self.time_finished = current_real_time
+            if self.cancellation_time is None:
+                self.cancellation_time = current_real_time
+            record = status_record(self.HPC_code, self.folder_name, percent, self.start_real_time, self.elapsed, None,
+                                   self.get_cancellation_datetime(current_real_time), terminal_state)
+        else:
+            self.elapsed = elapsed_time
+            self.time_finished = end_time
+            record = status_record(self.HPC_code, self.folder_name, percent, self.start_real_time, elapsed_time,
+                                   time_remaining, end_time, RUNNING_STATE)
+        return record
+
+    # The end time we found in the output file is a string, so turn it into a datetime for the status table
+    #
+    # @return the time the job was killed, or default if the output file didn't say
+    def get_cancellation_datetime(self, default):
+        if isinstance(self.cancellation_time, datetime):
+            return self.cancellation_time
+        try:
+            return datetime.fromisoformat(self.cancellation_time)
+        except (TypeError, ValueError):
+            return default
+    
+    # The HDF5 readers below all take:
+    #
+    #   fields:         the columns to read, e.g., ["time", "Force"] (default: all of them)
+    #   start, stop:    a slice of rows
+    #   time_range:     (first, last) to only read the rows with first <= time <= last
+    #   chunk_rows:     hand the data over as a generator of DataFrames of this many rows each, instead of one
+    #                   big DataFrame, so a huge file never has to fit in memory
+    #
+    # and open the file only for as long as they're reading it (see hdf5reader.py)
     
     # Return a pandas representation of our timehist file
     #
-    # Edit it to have it point to your relevant data
-    def get_timehist(self):
-        try:
-            timehist_loc = self.directory_name + "/timehist.h5"
-            timehist = h5.File(timehist_loc,'r')
-            
-            try:
-                arr = np.array(timehist.get('/LoadCell/Lattice_Center/Data'))
-                df = pd.DataFrame(arr)
-                print("    > Successfully extracted LoadCell data.")
-            except Exception as e:
-                print("ERROR: unable to pull data from " + self.folder_name + "/timehist.h5/LoadCell/Lattice_Center/Data. \n\t" + str(e))
-              
-            df['Job Name'] = self.folder_name
-            return df
-        except Exception as e:
-            print("ERROR: could not retrieve data from timehist.h5. \n\t" + str(e))
+    # Edit TIMEHIST_DATA in hdf5reader.py to have it point to your relevant data
+    def get_timehist(self, fields=None, start=None, stop=None, time_range=None, chunk_rows=None):
+        return self.read_hdf5("timehist.h5", hdf5reader.TIMEHIST_DATA, fields, start, stop, time_range, chunk_rows)
     
     # Return a pandas representation of our simon file
     #
-    # Edit it to have it point to your relevant data
-    def get_simon(self):
+    # Edit SIMON_DATA in hdf5reader.py to have it point to your relevant data
+    def get_simon(self, fields=None, start=None, stop=None, time_range=None, chunk_rows=None):
+        return self.read_hdf5("simon.h5", hdf5reader.SIMON_DATA, fields, start, stop, time_range, chunk_rows)
+    
+    # Return a pandas representation of our deletion file, every reason's deletions with a Reason column
+    #
+    # Edit DELETION_GROUP in hdf5reader.py to have it point to your relevant data. start and stop aren't
+    # much use across several datasets, so only fields, time_range and chunk_rows are taken.
+    #
+    # Every reason's read in one go into one preallocated array (see hdf5reader.read_groups()), and Reason is
+    # a categorical column of the reasons. With summary=True, you get just one row per reason instead: its
+    # Deletions and the First and Last deletion times, which only looks at each dataset's size and its first
+    # and last rows.
+    def get_deletion(self, fields=None, time_range=None, chunk_rows=None, summary=False):
+        location = self.directory_name + "/deletion.h5"
         try:
-            simon_loc = self.directory_name + "/simon.h5"
-            simon = h5.File(simon_loc,'r')
-            
-            try:
-                arr = np.array(simon.get('/physical_quantities/Data'))
-                df = pd.DataFrame(arr)
-                print("    > Successfully extracted data from simon.h5.")
-            except Exception as e:
-                print("ERROR: unable to pull data from " + self.folder_name + "/simon.h5/physical_quantities/Data. \n\t" + str(e))
-            
-            df['Job Name'] = self.folder_name
-            return df
+            reasons = hdf5reader.list_groups(location, hdf5reader.DELETION_GROUP)
         except Exception as e:
-            print("ERROR: could not retrieve data from simon.h5. \n\t" + str(e))
+            print("ERROR: could not retrieve data from deletion.h5. \n\t" + str(e))
+            return None
+        
+        # Later reasons come first, like they always have
+        reasons = list(reversed(reasons))
+        if chunk_rows is not None and not summary:
+            return self.iter_deletion(location, reasons, fields, time_range, chunk_rows)
+        try:
+            if summary:
+                df = pd.DataFrame(hdf5reader.summarize_groups(location, hdf5reader.DELETION_GROUP, "Data", reasons),
+                                  columns=['Reason', 'Deletions', 'First', 'Last'])
+                df['Reason'] = pd.Categorical(df['Reason'], categories=reasons)
+            else:
+                data, codes, reasons = hdf5reader.read_groups(location, hdf5reader.DELETION_GROUP, "Data", reasons,
+                                                              fields, time_range)
+                df = pd.DataFrame(data)
+                df['Reason'] = pd.Categorical.from_codes(codes, categories=reasons)
+            print("    > Successfully extracted data from deletion.h5 (" + str(len(reasons)) + " reasons).")
+        except Exception as e:
+            print("ERROR: unable to pull data from " + self.folder_name + "/deletion.h5. \n\t" + str(e))
+            return None
+        
+        df['Job Name'] = self.folder_name
+        return df
     
-    # Return a pandas representation of our deletion file
+    # get_deletion() a chunk at a time
     #
-    # Edit it to have it point to your relevant data    
-    def get_deletion(self):
+    # @return a generator of DataFrames
+    def iter_deletion(self, location, reasons, fields, time_range, chunk_rows):
+        for code, reason in enumerate(reasons):
+            for df in hdf5reader.iter_frames(location, hdf5reader.DELETION_GROUP + "/" + reason + "/Data", fields,
+                                             time_range=time_range, chunk_rows=chunk_rows):
+                df['Reason'] = pd.Categorical.from_codes(np.full(len(df), code), categories=reasons)
+                df['Job Name'] = self.folder_name
+                yield df
+    
+    # Read a dataset from one of our HDF5 result files for the readers above
+    #
+    # @return a DataFrame with a Job Name column (None if it couldn't be read), or a generator of them if
+    #         chunk_rows was given
+    def read_hdf5(self, file_name, path, fields, start, stop, time_range, chunk_rows):
+        location = self.directory_name + "/" + file_name
+        if chunk_rows is not None:
+            return self.iter_hdf5(location, path, fields, start, stop, time_range, chunk_rows)
         try:
-            deletion_loc = self.directory_name + "/deletion.h5"
-            deletion = h5.File(deletion_loc,'r')
-            deletions = deletion.get("Deletion")
-            try:
-                df = pd.DataFrame(columns=['time','Reason'])
-                for dset in list(deletions.keys()):
-                    path = str(dset) + "/Data"
-                    print("Trying", path)
-                    arr = np.array(deletions.get(path))
-                    sub_df = pd.DataFrame(arr)
-                    sub_df['Reason'] = dset
-                    df = pd.concat((sub_df, df))
-                    print("    > Successfully extracted data from deletion.h5/" + str(dset))
-            except Exception as e:
-                print("ERROR: unable to pull data from " + self.folder_name + "/deletion.h5. \n\t" + str(e))
-            
-            df['Job Name'] = self.folder_name
-            return df
+            df = pd.DataFrame(hdf5reader.read_dataset(location, path, fields, start, stop, time_range))
+            print("    > Successfully extracted data from " + file_name + ".")
         except Exception as e:
-            print("ERROR: could not retrieve data from deletion.h5. \n\t" + str(e))
\ No newline at end of file
+            print("ERROR: unable to pull data from " + self.folder_name + "/" + file_name + path + ". \n\t" + str(e))
+            return None
+        
+        df['Job Name'] = self.folder_name
+        return df
+    
+    # read_hdf5() a chunk at a time
+    #
+    # @return a generator of DataFrames
+    def iter_hdf5(self, location, path, fields, start, stop, time_range, chunk_rows):
+        for df in hdf5reader.iter_frames(location, path, fields, start, stop, time_range, chunk_rows):
+            df['Job Name'] = self.folder_name
+            yield df
+    
+    # Map one of our HDF5 result files' datasets straight from disk, e.g., get_memmap("timehist.h5",
+    # hdf5reader.TIMEHIST_DATA), so you can index into a huge one without reading it all
+    #
+    # @return a read-only numpy memmap, or None if the dataset's chunked or compressed and can't be mapped
+    def get_memmap(self, file_name, path):
+        return hdf5reader.memmap_dataset(self.directory_name + "/" + file_name, path)
+
+    # The summaries of our HDF5 result files (e.g., "Force max", "Deletions") from an hdf5summary.summary_store,
+    # which only reads the files again if they've changed since it last did
+    #
+    # @return {name: value}
+    def get_summary(self, store):
+        return store.get(self)
+
+# What job.pack() keeps
+PACKED_SLOTS = tuple([name for name in job.__slots__ if name != "snapshot"])
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Import custom scripts
+import config
+import tracing
+from job import job, unpack_job
+from runsnapshot import run_snapshot
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# The kinds of worker pool we know how to run (see config.py)
+EXECUTOR_KINDS = ("thread", "process", "asyncio")
+
+# Build or refresh the job for every run folder in a chunk
+#
+# Each item is (run directory, run_snapshot or None, cached job or None). If there's no snapshot we take one
+# here, and folders without a velodyne.card come back as None. Every job comes back with its timing data
+# already worked out, so the parsing happens here and not in whoever gets the jobs back. This lives at
+# module level so a process pool can send it to its workers.
+#
+# @return a list of (run directory, job or None) pairs
+def build_chunk(chunk):
+    built = list()
+    for directory, snapshot, cached in chunk:
+        new_job = None
+        with tracing.span("job", directory=directory, cached=cached is not None):
+            try:
+                if snapshot is None:
+                    snapshot = run_snapshot(directory)
+                if snapshot.has_velodyne_card():
+                    if cached is None:
+                        new_job = job(directory, snapshot)
+                    else:
+                        cached.refresh(snapshot)
+                        new_job = cached
+                    # Jobs only read their files when asked, so ask now while we're on a worker
+                    new_job.timing_data
+            except Exception as e:
+                print("ERROR: could not pull job from " + directory + ".\n\t" + repr(e))
+        built.append((directory, new_job))
+    return built
+
+# build_chunk() for threads, run under cProfile if we're profiling
+def build_profiled_chunk(chunk):
+    return tracing.profiled(build_chunk, chunk)
+
+# build_chunk() for a worker process
+#
+# Whole job objects are expensive to pickle, and tens of thousands of them cross the process boundary on
+# every refresh, so cached jobs go to the worker and built jobs come back as the plain tuples job.pack()
+# makes (no run_snapshot, and no class or attribute names repeated for every job).
+#
+# If we're tracing, the worker's spans (and cProfile stats) would die with it, so they're sent back too. A
+# forked worker starts out with a copy of whatever we'd recorded before the fork, so that's thrown away first.
+#
+# @return (list of (run directory, packed job or None) pairs, whatever tracing.take() returned or None)
+def build_packed_chunk(chunk):
+    if tracing.is_enabled():
+        tracing.reset()
+    chunk = [(directory, snapshot, unpack_job(cached) if cached is not None else None)
+             for directory, snapshot, cached in chunk]
+    built = tracing.profiled(build_chunk, chunk)
+    packed = [(directory, new_job.pack() if new_job is not None else None) for directory, new_job in built]
+    return packed, tracing.take() if tracing.is_enabled() else None
+
+# A pool of interns that builds jobs for run folders, handed out chunk_size folders at a time
+#
+# The pool itself is only started the first time we need it and then kept around, so watch mode can reuse
+# the same one for every refresh. Call shutdown() (or use it in a with block) when you're done.
+class job_executor:
+
+    def __init__(self, kind=None, workers=None, chunk_size=None):
+        if kind is None:
+            kind = config.EXECUTOR
+        if workers is None:
+            workers = config.WORKERS
+        if chunk_size is None:
+            chunk_size = config.CHUNK_SIZE
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError("Unknown executor kind \"" + str(kind) + "\", pick one of " + ", ".join(EXECUTOR_KINDS))
+        self.kind = kind
+        self.workers = workers
+        self.chunk_size = max(1, int(chunk_size))
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    # Start the pool the first time we need it
+    def get_pool(self):
+        if self.pool is None:
+            if self.kind == "process":
+                # Fork like multiprocessing.Pool always did here, so the workers don't re-run our scripts on import
+                context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            else:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    # Run every chunk through build_chunk with an event loop, handing the blocking part to our thread pool
+    async def gather_chunks(self, chunks):
+        loop = asyncio.get_event_loop()
+        pool = self.get_pool()
+        return await asyncio.gather(*[loop.run_in_executor(pool, build_profiled_chunk, chunk) for chunk in chunks])
+
+    # Build the job for every (run directory, run_snapshot or None, cached job or None) item
+    #
+    # Jobs built in another process are copies, so if you pass in a status_cache we put them back into it
+    #
+    # @return a list of (run directory, job or None) pairs, in the same order as items
+    def build_jobs(self, items, cache=None):
+        items = list(items)
+        if len(items) == 0:
+            return list()
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        with tracing.span("build_jobs", runs=len(items), chunks=len(chunks)):
+            if self.kind == "asyncio":
+                results = asyncio.run(self.gather_chunks(chunks))
+            elif self.kind == "process":
+                chunks = [[(directory, snapshot, cached.pack() if cached is not None else None)
+                           for directory, snapshot, cached in chunk] for chunk in chunks]
+                results = list()
+                for packed, taken in self.get_pool().map(build_packed_chunk, chunks):
+                    if taken is not None:
+                        tracing.merge(taken)
+                    results.append([(directory, unpack_job(new_job) if new_job is not None else None)
+                                    for directory, new_job in packed])
+            else:
+                results = self.get_pool().map(build_profiled_chunk, chunks)
+            built = [pair for result in results for pair in result]
+        if cache is not None:
+            cache.update([new_job for directory, new_job in built if new_job is not None])
+        return built
+
+# ----------------------------------------------------------------------------------------------------------- #
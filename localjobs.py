@@ -6,34 +6,28 @@ import os
 
 # Import custom scripts
 from job import job
+from runsnapshot import run_snapshot
 
 # ----------------------------------------------------------------------------------------------------------- #
 
-# This will search through the current folder and attempt to make a Job object for any folder
+# This will search through the given folder and attempt to make a Job object for any folder
 # that has a Velodyne card in it
 #
 # This could be changed to search for a few files and only make a job if they all exist (i.e., only attempt
 # instantation if there's an output file too)
 #
 # @return a list of job objects
-def return_jobs():
+def return_jobs(directory):
     jobs = list()
     search_terms, excluded_terms = get_input()
-    for folder in get_relevant_folders(search_terms, excluded_terms):
-        os.chdir(folder)
-        files_list = os.listdir()
-        found_velodyne = False
-        for file in files_list:
-            if "velodyne.card" in file:
-                found_velodyne = True
-                break
+    for folder in get_relevant_folders(directory, search_terms, excluded_terms):
         try:
-            if found_velodyne:
-                new_job = job()
+            snapshot = run_snapshot(os.path.join(directory, folder))
+            if snapshot.has_velodyne_card():
+                new_job = job(snapshot.directory, snapshot)
                 jobs.append(new_job)
         except Exception as e:
             print("ERROR: could not pull job from " + folder + ".\n\t" + repr(e))
-        os.chdir("../")
     return jobs
 
 # Simply asks the users for search terms and exclusion terms
@@ -46,18 +40,14 @@ def get_input():
     excluded_terms = excluded_terms.split()
     return search_terms, excluded_terms
 
-# This will look through the current directory and get all folders that 
+# This will look through the given directory and get all folders that 
 # 1) have at least one of the key terms in the name (if there are no key terms, select all) and
 # 2) have no excluded terms in the name (if there are no excluded terms, ignore this)
 #
-# @return a list of strings for the relevant subfolders in the current working directory
-def get_relevant_folders(search_terms, excluded_terms):
-    # Locate directory and relevant subfolders
-    directory = os.getcwd()
-    subfolders = list()
-    for i in os.listdir():
-        if os.path.isdir(i):
-            subfolders.append(i)
+# @return a list of strings for the names of the relevant subfolders in the directory
+def get_relevant_folders(directory, search_terms, excluded_terms):
+    # Locate relevant subfolders
+    subfolders = get_subfolders(directory)
 
     # Add all relevant folders to a list object
     potential_folders = list()
@@ -76,7 +66,16 @@ def get_relevant_folders(search_terms, excluded_terms):
     
     return relevant_folders
 
-# This will search through the current folder and attempt to make a Job object for any folder
+# @return a sorted list of the names of every folder in the directory
+def get_subfolders(directory):
+    subfolders = list()
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir():
+                subfolders.append(entry.name)
+    return sorted(subfolders)
+
+# This will search through the given folder and attempt to make a Job object for any folder
 # that has a Velodyne card in it
 #
 # This could be changed to search for a few files and only make a job if they all exist (i.e., only attempt
@@ -85,34 +84,36 @@ def get_relevant_folders(search_terms, excluded_terms):
 # THE DIFFERENCE BETWEEN THIS METHOD AND THE OTHER ONE IS THIS IS INTENDED FOR USE WITH GLOBALJOBS
 # AND GLOBALJOBSPARALLEL TO USE THE SAME SEARCH TERMS THROUGHOUT
 #
+# If you pass in a status_cache (see statuscache.py), finished jobs are taken straight from it and
+# running jobs only re-parse the files that changed since the last scan
+#
+# Nothing here depends on the working directory, so it's safe to call from several threads at once
+#
 # @return a list of job objects
-def return_jobs_given_terms(search_terms, excluded_terms):
+def return_jobs_given_terms(directory, search_terms, excluded_terms, cache=None):
     jobs = list()
     
-    # Attempt to create a job for every relevant subfolder in the current working directory
-    for folder in get_relevant_folders(search_terms, excluded_terms):
-        os.chdir(folder)
-        files_list = os.listdir()
-        found_velodyne = False
-        for file in files_list:
-            if "velodyne.card" in file:
-                found_velodyne = True
-                break
+    # Attempt to create a job for every relevant subfolder in the directory
+    for folder in get_relevant_folders(directory, search_terms, excluded_terms):
+        run_directory = os.path.join(directory, folder)
         try:
-            if found_velodyne:
-                new_job = job()
+            if cache is not None:
+                new_job = cache.get_job(run_directory)
+            else:
+                snapshot = run_snapshot(run_directory)
+                new_job = job(run_directory, snapshot) if snapshot.has_velodyne_card() else None
+            if new_job is not None:
                 jobs.append(new_job)
         except Exception as e:
             print("ERROR: could not pull job from " + folder + ".\n\t" + repr(e))
-        os.chdir("../")
     
     # Print information to the console
     num_jobs = len(jobs)
     if(num_jobs > 0):
         if(num_jobs > 1):
-            print("    > " + str(len(jobs)) + " jobs loaded from " + os.getcwd() + ".")
+            print("    > " + str(len(jobs)) + " jobs loaded from " + directory + ".")
         elif(num_jobs == 1):
-            print("    > " + str(len(jobs)) + " job loaded from " + os.getcwd() + ".")
+            print("    > " + str(len(jobs)) + " job loaded from " + directory + ".")
     return jobs
     
 # ----------------------------------------------------------------------------------------------------------- #
\ No newline at end of file
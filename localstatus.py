@@ -2,6 +2,8 @@
 # coding: utf-8
 
 # Import general libraries
+import os
+import time
 import pandas as pd
 
 # Import custom scripts
@@ -10,8 +12,8 @@ import getstatuses as get_stat
 
 # ----------------------------------------------------------------------------------------------------------- #
 
-# Get jobs
-joblist = localjobs.return_jobs()
+# Get jobs from the folder we were run in
+joblist = localjobs.return_jobs(os.getcwd())
 
 # Format pandas DataFrame
 statuses = get_stat.get_statuses(joblist)
@@ -19,6 +21,6 @@ statuses = statuses.sort_values(by=['Remaining'])
 statuses.reset_index()
 
 # Print HTML output
-get_stat.print_to_HTML(statuses)
+get_stat.print_to_HTML(statuses, time.time())
 
 # ----------------------------------------------------------------------------------------------------------- #
\ No newline at end of file
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import os
+import threading
+from collections import deque
+
+# Import custom scripts
+import tracing
+from runsnapshot import run_snapshot
+from jobexecutor import job_executor
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Finds every Velodyne run (any folder with a velodyne.card) under a root folder, at any depth, and makes a
+# job for each one
+#
+# The tree is walked by a team of interns (threads), one folder at a time. Each intern keeps its own pile
+# of folders still to look at and works from the top of it; an intern whose pile is empty steals from the
+# bottom of someone else's. So one huge subfolder next to twenty tiny ones gets split up between everybody instead of
+# keeping one intern busy while the rest sit around.
+#
+# As we go:
+# 1) folders with an excluded term in their name are skipped, along with everything under them
+# 2) once a folder's name has a search term in it, every run under it counts as a match (with no search
+#    terms, everything matches)
+# 3) we don't look inside run folders for more runs
+# 4) finished jobs in the status cache are reused without even listing their folder
+#
+# Once the walk is done, the run folders that need parsing are handed to a job_executor (see jobexecutor.py)
+# in chunks, which is where the actual job building happens
+#
+# To walk the same tree again and again (e.g., in watch mode), pass in the listings from the last walk (an
+# empty dict the first time) and keep this walk's self.listings for the next one. A folder whose mtime hasn't
+# changed since the last walk isn't listed again, we just reuse what was in it. A run folder's files growing
+# doesn't change its mtime, so running jobs still get a fresh snapshot when they're built.
+class run_walker:
+
+    def __init__(self, root, search_terms, excluded_terms, cache=None, executor=None, listings=None):
+        self.root = root
+        self.search_terms = list(search_terms)
+        self.excluded_terms = list(excluded_terms)
+        self.cache = cache
+        self.executor = executor
+        workers = executor.workers if executor is not None else None
+        if workers is None:
+            workers = min(32, (os.cpu_count() or 1) + 4)
+        self.workers = max(1, workers)
+
+        # One pile of (folder, matched) pairs per intern, and a count of folders not finished yet
+        self.piles = [deque() for i in range(self.workers)]
+        self.pending = 0
+        self.condition = threading.Condition()
+        self.jobs = list()
+        self.runs = list()
+
+        # {folder: (mtime, whether it's a run, its subfolders)} from the last walk and this one, if we're keeping
+        # them (None if not, which saves a stat of every folder)
+        self.old_listings = listings
+        self.listings = dict() if listings is not None else None
+
+    # Put a folder on an intern's pile
+    def push(self, worker, directory, matched):
+        with self.condition:
+            self.pending += 1
+            self.piles[worker].append((directory, matched))
+            self.condition.notify()
+
+    # Take the next folder off our own pile, or steal the oldest one from another intern's pile
+    #
+    # @return a (folder, matched) pair, or None once every folder has been looked at
+    def get_work(self, worker):
+        with self.condition:
+            while True:
+                if len(self.piles[worker]) > 0:
+                    return self.piles[worker].pop()
+                for i in range(1, self.workers):
+                    victim = self.piles[(worker + i) % self.workers]
+                    if len(victim) > 0:
+                        return victim.popleft()
+                if self.pending == 0:
+                    return None
+                self.condition.wait()
+
+    # Mark a folder as finished, and wake everybody up if it was the last one
+    def done(self):
+        with self.condition:
+            self.pending -= 1
+            if self.pending == 0:
+                self.condition.notify_all()
+
+    # Look at one folder: queue it up to be built if it's a run, otherwise add its subfolders to our pile
+    def visit(self, worker, directory, matched):
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.jobs.get(directory)
+            if cached is not None and cached.is_finished():
+                if matched:
+                    self.jobs.append(cached)
+                return
+
+        # Reuse the last walk's listing if the folder hasn't changed since
+        mtime = None
+        listing = None
+        if self.listings is not None:
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                pass
+            listing = self.old_listings.get(directory)
+        if listing is not None and mtime is not None and listing[0] == mtime:
+            self.listings[directory] = listing
+            is_run, subdirectories = listing[1], listing[2]
+            snapshot = None
+        else:
+            with tracing.span("scandir", directory=directory):
+                snapshot = run_snapshot(directory)
+            is_run, subdirectories = snapshot.has_velodyne_card(), list(snapshot.subdirectories)
+            if mtime is not None:
+                self.listings[directory] = (mtime, is_run, subdirectories)
+
+        if is_run:
+            if matched:
+                self.runs.append((directory, snapshot, cached))
+            return
+
+        for name in subdirectories:
+            if any([term in name for term in self.excluded_terms]):
+                continue
+            child_matched = matched or any([term in name for term in self.search_terms])
+            self.push(worker, os.path.join(directory, name), child_matched)
+
+    # What every intern does until there's nothing left
+    def work(self, worker):
+        while True:
+            item = self.get_work(worker)
+            if item is None:
+                return
+            directory, matched = item
+            try:
+                self.visit(worker, directory, matched)
+            except Exception as e:
+                print("ERROR: could not pull job from " + directory + ".\n\t" + repr(e))
+            finally:
+                self.done()
+
+    # Walk the whole tree
+    #
+    # @return a list of lists of jobs, one list per folder that has runs in it, same as globaljobs.return_all_jobs()
+    def run(self):
+        with tracing.span("discover", root=self.root):
+            self.push(0, self.root, len(self.search_terms) == 0)
+            interns = [threading.Thread(target=tracing.profiled, args=(self.work, i), daemon=True) for i in range(self.workers)]
+            for intern in interns:
+                intern.start()
+            for intern in interns:
+                intern.join()
+
+        # Build (or refresh) the jobs for every run that needs it
+        executor = self.executor if self.executor is not None else job_executor("thread", self.workers)
+        try:
+            for directory, new_job in executor.build_jobs(self.runs, self.cache):
+                if new_job is not None:
+                    self.jobs.append(new_job)
+        finally:
+            if executor is not self.executor:
+                executor.shutdown()
+
+        folders = dict()
+        for found in self.jobs:
+            folders.setdefault(os.path.dirname(found.directory_name), list()).append(found)
+        return [sorted(folders[folder]) for folder in sorted(folders)]
+
+# Find every Velodyne run under root at any depth, see run_walker above
+#
+# @return a list of lists of jobs, one list per folder that has runs in it
+def discover_runs(root, search_terms, excluded_terms, cache=None, executor=None):
+    return run_walker(root, search_terms, excluded_terms, cache, executor).run()
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import os
+import re
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Output files look like whatever.o123456, where the digits are the HPC job code
+OUTPUT_FILE_PATTERN = re.compile(r'\.o(\d+)$')
+
+# A snapshot of everything in a Velodyne run folder, taken with a single os.scandir()
+#
+# On a parallel filesystem every directory listing is a metadata round trip, so we list the run folder
+# once and answer all of job's questions about it ("which is the latest .o file?", "is there a velodyne.card?")
+# from memory
+#
+# Sizes and mtimes come from DirEntry.stat(), which is only called (and then cached) the first time we ask
+# for a file, so we don't pay for a stat on every file in the folder
+class run_snapshot:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = dict()
+        self.subdirectories = list()
+        self.stats = dict()
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        self.subdirectories.append(entry.name)
+                    else:
+                        self.entries[entry.name] = entry
+                except OSError as e:
+                    print("ERROR: could not read " + entry.path + ".\n\t" + repr(e))
+
+    # DirEntry objects can't be pickled, so only send the names and whatever we've already stat'ed
+    def __getstate__(self):
+        return {"directory": self.directory,
+                "entries": dict.fromkeys(self.entries),
+                "subdirectories": self.subdirectories,
+                "stats": self.stats}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    # @return a list of every file name in the run folder
+    def get_file_names(self):
+        return list(self.entries)
+
+    # @return (size in bytes, mtime) for a file in the run folder, or None if it isn't there
+    def get_stat(self, file_name):
+        if file_name not in self.stats:
+            entry = self.entries.get(file_name)
+            if entry is None:
+                if file_name not in self.entries:
+                    return None
+                stat = os.stat(os.path.join(self.directory, file_name))
+            else:
+                stat = entry.stat()
+            self.stats[file_name] = (stat.st_size, stat.st_mtime)
+        return self.stats[file_name]
+
+    # @return True if there's a velodyne.card in the run folder
+    def has_velodyne_card(self):
+        for file_name in self.entries:
+            if "velodyne.card" in file_name:
+                return True
+        return False
+
+    # @return a dict of {HPC code (int): file name} for every .o###### file in the run folder
+    def get_output_files(self):
+        output_files = dict()
+        for file_name in self.entries:
+            match = OUTPUT_FILE_PATTERN.search(file_name)
+            if match:
+                output_files[int(match.group(1))] = file_name
+        return output_files
+
+    # @return the name of the output file with the largest HPC code (i.e., the most recent one), or None
+    def get_latest_output_file(self):
+        output_files = self.get_output_files()
+        if len(output_files) == 0:
+            return None
+        return output_files[max(output_files)]
+
+    # @return the largest HPC code among our output files, or None
+    def get_HPC_code(self):
+        output_files = self.get_output_files()
+        if len(output_files) == 0:
+            return None
+        return max(output_files)
+
+    # @return the name of the most recent status.timestep file, or None
+    def get_latest_timestep(self):
+        timestep_files = [f for f in self.entries if "status.timestep" in f]
+        if len(timestep_files) == 0:
+            return None
+        return max(timestep_files)
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import os
+import pickle
+import tempfile
+
+# Import custom scripts
+from job import job
+from categoryindex import category_index
+from runsnapshot import run_snapshot
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Where we keep the jobs from the last scan between runs
+CACHE_LOCATION = "/beegfs/interns/esnell/Unit_Cells/.status_cache.pkl" # <------------------------- EDIT LOCATION
+
+# Bump this whenever the job class changes shape, so old caches get thrown out instead of unpickled wrong
+CACHE_VERSION = 4
+
+# A persistent cache of job objects, keyed by run directory
+#
+# Every job remembers the (size, mtime) fingerprints of its velodyne.card, latest .o file and latest
+# status.timestep (see job.get_fingerprints()). On the next scan:
+# 1) jobs that already finished (COMPLETE, CANCELED, TIMEOUT, ...) are reused as they are, without even listing
+#    their run folder
+# 2) running jobs get a fresh run_snapshot and only re-parse the files whose fingerprint changed
+# 3) folders we haven't seen before become brand new jobs
+#
+# It also keeps the category_index of every job's name for the job filter dropdown, saved along with the jobs
+class status_cache:
+
+    def __init__(self, location=CACHE_LOCATION, rebuild=False):
+        self.location = location
+        self.jobs = dict()
+        self.categories = category_index()
+        if not rebuild:
+            self.load()
+
+    # Read the cache from disk, starting over if it's missing, unreadable, or from an older version
+    def load(self):
+        try:
+            with open(self.location, 'rb') as f:
+                cached = pickle.load(f)
+            if cached.get("version") == CACHE_VERSION:
+                self.jobs = cached["jobs"]
+                self.categories = cached.get("categories", self.categories)
+                self.categories.add_all(cached_job.folder_name for cached_job in self.jobs.values())
+            else:
+                print("    > Status cache at " + self.location + " is out of date, rebuilding it.")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print("ERROR: could not read status cache, rebuilding it.\n\t" + repr(e))
+
+    # Write the cache to a temporary file next to it and swap it in, so a crash mid-write
+    # never leaves a half-written cache behind
+    def save(self):
+        try:
+            directory = os.path.dirname(os.path.abspath(self.location))
+            handle, temp_location = tempfile.mkstemp(dir=directory, prefix=".status_cache.")
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump({"version": CACHE_VERSION, "jobs": self.jobs, "categories": self.categories}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_location, self.location)
+        except Exception as e:
+            print("ERROR: could not write status cache to " + self.location + ".\n\t" + repr(e))
+
+    # Return the job for a run folder, reusing the cached one wherever we can
+    #
+    # Pass in a run_snapshot of the folder if you already took one
+    #
+    # @return a job, or None if the folder has no velodyne.card
+    def get_job(self, directory, snapshot=None):
+        cached = self.jobs.get(directory)
+        if cached is not None and cached.is_finished():
+            return cached
+        if snapshot is None:
+            snapshot = run_snapshot(directory)
+        if not snapshot.has_velodyne_card():
+            return None
+        if cached is None:
+            cached = job(directory, snapshot)
+        else:
+            cached.refresh(snapshot)
+        self.jobs[directory] = cached
+        self.categories.add(cached.folder_name)
+        return cached
+
+    # Store jobs that were built somewhere else (e.g., by a worker process with its own copy of the cache)
+    def update(self, jobs):
+        for new_job in jobs:
+            self.jobs[new_job.directory_name] = new_job
+            self.categories.add(new_job.folder_name)
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import time
+import signal
+import threading
+
+# Import custom scripts
+import tracing
+import rundiscovery
+import getstatuses as get_stat
+from jobexecutor import job_executor
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Keeps the job set in memory and regenerates the HTML page whenever something changes, instead of
+# paying for a fresh interpreter, pandas import and full tree walk from cron every time
+#
+# Each pass walks the tree at any depth, like auto mode (see rundiscovery.py), and:
+# 1) re-lists a folder only if its mtime changed since the last pass
+# 2) takes finished jobs straight from the status cache without touching their folders
+# 3) re-snapshots running jobs--their files grow in place, which doesn't change the folder's mtime,
+#    so we always have to look at them--and only re-parses the files that changed
+#
+# The page is only rewritten when something on it changed, and then `debounce` seconds after the first change
+# we haven't written yet, so a burst of changes turns into a single write. Running jobs change the table on
+# nearly every pass, so we don't wait for it to stop changing, which it may never do.
+class status_watcher:
+
+    # If tracing is on, the spans from each pass are written to trace_location (see tracing.py) and then
+    # forgotten, so the file always holds the latest pass. table_mode is passed on to print_to_HTML(), and if
+    # you pass in an hdf5summary.summary_store, every pass updates the summaries of the HDF5 files that changed.
+    def __init__(self, root, cache, interval=60, debounce=5, persist=True, executor=None, trace_location=None,
+                 trace_format="json", table_mode=None, summaries=None):
+        self.root = root
+        self.cache = cache
+        self.table_mode = table_mode
+        self.summaries = summaries
+        self.trace_location = trace_location
+        self.trace_format = trace_format
+
+        # The pool that snapshots and refreshes running jobs, kept for as long as we're watching
+        self.own_executor = executor is None
+        self.executor = executor if executor is not None else job_executor()
+        self.interval = interval
+        self.debounce = debounce
+        self.persist = persist
+        self.stop_event = threading.Event()
+
+        # mtime and contents of every folder we've listed, so we only list them again when they change
+        self.listings = dict()
+
+        # Digest of the table we last wrote, and when the table first stopped matching it (None if it still does)
+        self.written_digest = None
+        self.pending_since = None
+
+    # Ask the watcher to finish the pass it's on and exit
+    def stop(self, signum=None, frame=None):
+        self.stop_event.set()
+
+    # Walk the tree with rundiscovery's walker, at any depth like globalstatus.py's auto mode, only listing
+    # folders whose mtime changed since the last pass, and bring every job up to date
+    #
+    # @return a list of lists of jobs, one list per folder with runs in it, same as globaljobs.return_all_jobs()
+    def scan(self):
+        walker = rundiscovery.run_walker(self.root, [], [], self.cache, self.executor, self.listings)
+        job_lists = walker.run()
+        self.listings = walker.listings
+        return job_lists
+
+    # @return a digest of what the page would show of the table, to tell whether any row changed
+    def get_digest(self, statuses):
+        return get_stat.get_table_digest(statuses)
+
+    # Do one pass, then write out its spans if we're tracing
+    #
+    # @return how long to wait before the next pass, in seconds
+    def step(self):
+        try:
+            return self.refresh()
+        finally:
+            if tracing.is_enabled() and self.trace_location is not None:
+                tracing.write(self.trace_location, self.trace_format)
+                tracing.reset(profile=False)
+
+    # Do one pass and write the page if the table changed and has settled
+    #
+    # @return how long to wait before the next pass, in seconds
+    def refresh(self):
+        start_time = time.time()
+        job_lists = tracing.profiled(self.scan)
+        if self.summaries is not None:
+            with tracing.span("hdf5_summaries"):
+                self.summaries.refresh([new_job for job_list in job_lists for new_job in job_list], self.executor)
+        with tracing.span("get_statuses", jobs=sum(len(l) for l in job_lists)):
+            statuses = get_stat.get_all_statuses(job_lists)
+        digest = self.get_digest(statuses)
+
+        if digest == self.written_digest:
+            self.pending_since = None
+            return self.interval
+        if self.pending_since is None:
+            self.pending_since = start_time
+        waited = time.time() - self.pending_since
+        if waited < self.debounce:
+            # Come back when the wait's up rather than a whole interval later
+            return min(self.interval, self.debounce - waited)
+
+        print("    > Table changed, writing HTML page (" + str(sum(len(l) for l in job_lists)) + " jobs).")
+        tracing.profiled(get_stat.print_to_HTML, statuses, start_time, table_mode=self.table_mode,
+                         categories=self.cache.categories)
+        self.written_digest = digest
+        self.pending_since = None
+        if self.persist:
+            self.cache.save()
+        return self.interval
+
+    # Keep scanning every `interval` seconds until we get SIGTERM or SIGINT
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print("Watching " + self.root + " every " + str(self.interval) + " seconds...")
+        while not self.stop_event.is_set():
+            try:
+                wait = self.step()
+            except Exception as e:
+                print("ERROR: status refresh failed.\n\t" + repr(e))
+                wait = self.interval
+            self.stop_event.wait(wait)
+        if self.persist:
+            self.cache.save()
+        if self.own_executor:
+            self.executor.shutdown()
+        print("Stopped watching " + self.root + ".")
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# h5py is only needed for the optional HDF5 result files
+try:
+    import h5py as h5
+    import numpy as np
+except ImportError:
+    h5 = None
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Builds a fake tree of Velodyne runs to benchmark against, laid out the same way as the real thing:
+#
+# root
+#	- Subfolder 1
+#		- Velodyne Run #1
+#		- ...
+#	- ...
+#
+# Every run gets a velodyne.card, one or more .o###### output files (older ones from "resubmissions"), a
+# status.timestep and, if you ask for them, timehist.h5 / simon.h5 / deletion.h5. The output files and
+# status.timestep can be made as big as you like, so you can see what a multi-GB log does to a scan.
+#
+# Usage:
+#   python synthtree.py ROOT [--subfolders 8] [--runs 50] [--output-mb 1] [--timestep-mb 2] [--hdf5]
+
+# The states a fake run can be in, and the last lines of its output file for each
+OUTPUT_TAILS = {
+    "complete": " Normal termination\n Total Computation Time: 1.234e+04\n",
+    "canceled": "slurmstepd: error: *** JOB {code} ON compute07 CANCELLED AT 2023-01-02T08:00:00 ***\n",
+    "timeout": "slurmstepd: error: *** JOB {code} ON compute07 CANCELLED AT 2023-01-02T08:00:00 DUE TO TIME LIMIT ***\n",
+    "oom": "slurmstepd: error: Detected 1 oom-kill event(s) in StepId={code}.batch. Some of your processes may " + \
+        "have been killed by the cgroup out-of-memory handler.\n",
+    "running": "",
+}
+
+# What the bulk of an output file looks like
+OUTPUT_LINE = " cycle {cycle:>10}   time  {time:.6e}   dt  1.000000e-08   energy  9.876543e+02\n"
+
+# @return the text of a velodyne.card with a description and a termination time
+def return_velodyne_card(name, duration):
+    lines = ["*" + "-" * 70,
+             "* Problem Title",
+             "*   Synthetic unit cell run " + name,
+             "*   Lattice compression at constant strain rate",
+             "* Subtitle",
+             "*" + "-" * 70]
+    # Pad it out with the kind of material and contact blocks a real card has, before the termination time
+    for i in range(40):
+        lines.append("Material " + str(i) + "    density 7.85e+03   modulus 2.10e+11   poisson 0.30")
+    lines.append("Termination time    " + "{:.6f}".format(duration))
+    for i in range(100):
+        lines.append("Output block " + str(i) + "    interval 1.0e-05")
+    return "\n".join(lines) + "\n"
+
+# Write an output file of about size_mb megabytes that ends with the tail for the given state
+#
+# The bulk is one block written over and over, so multi-GB files don't take forever
+def write_output_file(file_name, size_mb, state, code):
+    block = "".join([OUTPUT_LINE.format(cycle=i, time=i * 1e-8) for i in range(2000)]).encode()
+    size = int(size_mb * 1024 * 1024)
+    with open(file_name, 'wb') as f:
+        written = 0
+        while written + len(block) <= size:
+            f.write(block)
+            written += len(block)
+        f.write(block[:max(0, size - written)].rsplit(b"\n", 1)[0] + b"\n")
+        f.write(OUTPUT_TAILS[state].format(code=code).encode())
+
+# Write a status.timestep of about size_mb megabytes (at least two rows), one row per simulated second of
+# wall time, ending at `fraction` of `duration`
+def write_status_timestep(file_name, size_mb, duration, fraction):
+    start = datetime(2023, 1, 1, 8, 0, 0)
+    row_length = len("2023/01/01, 08:00:00, 1000000, 1.000000e-03, 1.0e-08\n")
+    rows = max(2, int(size_mb * 1024 * 1024 / row_length))
+    with open(file_name, 'w') as f:
+        f.write("  Date        Time      Cycle     Time          Timestep\n")
+        batch = list()
+        for i in range(rows):
+            now = start + timedelta(seconds=i)
+            sim_time = duration * fraction * (i + 1) / rows
+            batch.append(now.strftime("%Y/%m/%d, %H:%M:%S, ") + str(i * 100) + ", " + "{:.6e}".format(sim_time) + ", 1.0e-08\n")
+            if len(batch) == 10000:
+                f.write("".join(batch))
+                batch = list()
+        f.write("".join(batch))
+
+# Write the HDF5 result files job.get_timehist(), get_simon() and get_deletion() read
+def write_hdf5_files(directory, rows, rng):
+    time = np.linspace(0.0, 0.01, rows)
+    load = np.dtype([("time", "f8"), ("Force", "f8"), ("Displacement", "f8")])
+    with h5.File(os.path.join(directory, "timehist.h5"), 'w') as f:
+        data = np.zeros(rows, dtype=load)
+        data["time"] = time
+        data["Force"] = np.sin(time * 300) * rng.uniform(1e3, 1e4)
+        data["Displacement"] = time * 0.1
+        f.create_dataset("/LoadCell/Lattice_Center/Data", data=data)
+    energy = np.dtype([("time", "f8"), ("Kinetic Energy", "f8"), ("Internal Energy", "f8")])
+    with h5.File(os.path.join(directory, "simon.h5"), 'w') as f:
+        data = np.zeros(rows, dtype=energy)
+        data["time"] = time
+        data["Kinetic Energy"] = time * rng.uniform(1e2, 1e3)
+        data["Internal Energy"] = time ** 2 * rng.uniform(1e4, 1e5)
+        f.create_dataset("/physical_quantities/Data", data=data)
+    deleted = np.dtype([("time", "f8"), ("Element", "i8")])
+    with h5.File(os.path.join(directory, "deletion.h5"), 'w') as f:
+        for reason in ("Plastic_Strain", "Timestep", "Distortion"):
+            count = rng.randint(0, rows // 10)
+            data = np.zeros(count, dtype=deleted)
+            data["time"] = np.sort(np.array([rng.uniform(0.0, 0.01) for i in range(count)]))
+            data["Element"] = np.arange(count)
+            f.create_dataset("/Deletion/" + reason + "/Data", data=data)
+
+# Write a run folder in the given state
+def write_run(directory, name, code, state, output_mb, timestep_mb, resubmissions, hdf5_rows, rng):
+    os.makedirs(directory, exist_ok=True)
+    duration = 0.01
+    with open(os.path.join(directory, "velodyne.card"), 'w') as f:
+        f.write(return_velodyne_card(name, duration))
+    for i in range(resubmissions):
+        write_output_file(os.path.join(directory, name + ".o" + str(code - 100 * (i + 1))), 0.01, "canceled", code)
+    write_output_file(os.path.join(directory, name + ".o" + str(code)), output_mb, state, code)
+    fraction = 1.0 if state == "complete" else rng.uniform(0.05, 0.95)
+    write_status_timestep(os.path.join(directory, "status.timestep"), timestep_mb, duration, fraction)
+    if hdf5_rows > 0:
+        write_hdf5_files(directory, hdf5_rows, rng)
+
+# Build a tree of subfolders x runs fake Velodyne runs under root
+#
+# output_mb and timestep_mb set the size of each run's latest .o file and status.timestep, states is which
+# states to pick from (see OUTPUT_TAILS), resubmissions adds that many older .o files to each run, and
+# hdf5_rows > 0 writes HDF5 result files with that many rows (needs h5py)
+#
+# @return the number of runs written
+def make_tree(root, subfolders=4, runs=25, output_mb=0.01, timestep_mb=0.01, states=None, resubmissions=0,
+              hdf5_rows=0, seed=0):
+    if hdf5_rows > 0 and h5 is None:
+        raise ImportError("h5py is needed to write the HDF5 result files")
+    if states is None:
+        states = ["complete", "canceled", "running"]
+    rng = random.Random(seed)
+    code = 100000
+    for i in range(subfolders):
+        for j in range(runs):
+            code += 1000
+            name = "unit_cell_" + str(i) + "_" + str(j)
+            directory = os.path.join(root, "Subfolder_" + str(i), name)
+            write_run(directory, name, code, rng.choice(states), output_mb, timestep_mb, resubmissions, hdf5_rows, rng)
+    return subfolders * runs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a fake tree of Velodyne runs for benchmarking")
+    parser.add_argument("root", help="where to build the tree")
+    parser.add_argument("--subfolders", type=int, default=8, help="number of subfolders (default: 8)")
+    parser.add_argument("--runs", type=int, default=50, help="runs per subfolder (default: 50)")
+    parser.add_argument("--output-mb", type=float, default=1, help="size of each run's latest .o file (default: 1)")
+    parser.add_argument("--timestep-mb", type=float, default=2, help="size of each status.timestep (default: 2)")
+    parser.add_argument("--states", nargs="+", choices=sorted(OUTPUT_TAILS), default=["complete", "canceled", "running"],
+                        help="states to pick from for each run (default: complete canceled running)")
+    parser.add_argument("--resubmissions", type=int, default=0, help="older .o files per run (default: 0)")
+    parser.add_argument("--hdf5", action="store_true", help="also write timehist.h5, simon.h5 and deletion.h5")
+    parser.add_argument("--hdf5-rows", type=int, default=10000, help="rows per HDF5 dataset (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    num_runs = make_tree(args.root, args.subfolders, args.runs, args.output_mb, args.timestep_mb, args.states,
+                         args.resubmissions, args.hdf5_rows if args.hdf5 else 0, args.seed)
+    print("Wrote " + str(num_runs) + " fake runs to " + args.root + ".")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from collections import namedtuple
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# How fast a run is going, worked out from its status.timestep a few new rows at a time
+#
+# Every row of status.timestep is a wall clock time and the simulated time the run had reached by then. We
+# remember how far into the file we've read, so each refresh only reads (and parses) the rows written since
+# the last one, and fold them into an exponentially weighted average of the throughput (simulated seconds per
+# wall second) that mostly remembers the last RATE_TIME_CONSTANT seconds. Unlike a straight line from the
+# first row to the last, that follows the run when the timestep size changes, and gaps longer than
+# PAUSE_SECONDS (the job sitting in the queue after a requeue) or the simulated time going backwards (a
+# restart from a checkpoint) are left out of it altogether.
+#
+# The first time we see a file, we only read its first row (for the start time) and its last HISTORY_BYTES
+# (or, for a job that's already finished, just enough to find its last row), so a multi-GB status.timestep
+# doesn't have to be read from the top.
+
+# How much of the end of a status.timestep we read to get the throughput going the first time we see it. A
+# scan of a tree we haven't seen before does this for every running job, so it's one read's worth
+HISTORY_BYTES = 64 * 1024
+
+# How much of the end of a finished job's status.timestep we read, which only has to hold its last row
+FINISHED_HISTORY_BYTES = 4 * 1024
+
+# We read new rows in blocks of up to this many bytes, so a big batch of them never has to fit in memory
+READ_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Wall seconds over which the throughput forgets what happened before
+RATE_TIME_CONSTANT = 900.0
+
+# Longer than this between two rows and the run was paused, not slow, so that gap doesn't count
+PAUSE_SECONDS = 1800.0
+
+# A running job is stalled once status.timestep or the simulated time in it hasn't moved for this long
+STALL_SECONDS = 1800.0
+
+# What timestep_progress.get_estimate() tells you
+#
+#   sim_time:       the simulated time the run's reached
+#   throughput:     simulated seconds per wall second lately (None until there are two rows to go on)
+#   remaining:      how much longer it'll take at that throughput, as a timedelta (None if we can't tell)
+#   end_time:       when it'll finish at that throughput, as a datetime (None if we can't tell)
+#   stalled:        True if the run hasn't moved for STALL_SECONDS
+timestep_estimate = namedtuple("timestep_estimate", ["sim_time", "throughput", "remaining", "end_time", "stalled"])
+
+# The dates in status.timestep, and what we keep its times as (seconds since the epoch, as if they were UTC)
+DATE_FORMAT = '%Y/%m/%d'
+EPOCH = datetime(1970, 1, 1)
+
+# Parse a block of whole rows of status.timestep, skipping any that aren't rows
+#
+# Rows are "2023/01/01, 08:00:00, cycle, simulated time, timestep". Each day is only run through strptime
+# once, and the time of day is added on by hand, which is most of what makes this fast enough to run on every
+# new row (pandas.read_csv() costs more than that to get going on the few KB a refresh usually brings)
+#
+# @return (wall seconds, simulated time) as numpy arrays
+def parse_rows(data):
+    days = dict()
+    wall = list()
+    sim = list()
+    for line in data.decode(errors='replace').replace(",", " ").splitlines():
+        fields = line.split()
+        try:
+            day = days.get(fields[0])
+            if day is None:
+                day = days[fields[0]] = (datetime.strptime(fields[0], DATE_FORMAT) - EPOCH).total_seconds()
+            hours, minutes, seconds = fields[1].split(":")
+            value = float(fields[3])
+            wall.append(day + int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+            sim.append(value)
+        except (IndexError, ValueError):
+            continue
+    return np.array(wall, dtype=float), np.array(sim, dtype=float)
+
+# @return the (wall seconds, simulated time) of one row of status.timestep, or None if it isn't one
+def parse_line(line):
+    wall, sim = parse_rows(line)
+    if len(wall) == 0:
+        return None
+    return wall[0], sim[0]
+
+# @return seconds since the epoch as a datetime
+def to_datetime(seconds):
+    return EPOCH + timedelta(seconds=float(seconds))
+
+# Where we've got to in one job's status.timestep, kept on the job (and so in the status cache) between scans
+class timestep_progress:
+
+    __slots__ = ("location", "offset", "start", "wall", "sim", "rate", "last_advance", "mtime", "tail")
+
+    def __init__(self):
+        self.reset(None)
+
+    # Forget everything and start reading location from the top
+    def reset(self, location):
+        self.location = location
+        # How far into the file we've read, always at the start of a row
+        self.offset = 0
+        # Wall seconds of the first row
+        self.start = None
+        # Wall seconds and simulated time of the last row we've read, and the throughput up to it
+        self.wall = None
+        self.sim = None
+        self.rate = None
+        # Wall seconds of the last row the simulated time went up at, and the file's mtime
+        self.last_advance = None
+        self.mtime = None
+        # (wall seconds, simulated time) of a last row that hasn't got its newline yet, if there is one
+        self.tail = None
+
+    # Read the rows written to status.timestep since we last looked
+    #
+    # size and mtime are the file's, from the run_snapshot. A different file (the run was resubmitted) or
+    # one that got shorter (it was rewritten) is read again from the top. Pass finished=True for a job that's
+    # already finished, so a file we haven't seen before only has its first and last rows read.
+    def update(self, location, size, mtime, finished=False):
+        if location != self.location or size < self.offset:
+            self.reset(location)
+        self.mtime = mtime
+        if self.start is not None and size == self.offset:
+            return
+        self.tail = None
+        with open(location, 'rb') as f:
+            history = FINISHED_HISTORY_BYTES if finished else HISTORY_BYTES
+            if self.offset == 0 and not self.read_start(f, size, history):
+                return
+            f.seek(self.offset)
+            while True:
+                block = f.read(READ_BLOCK_SIZE)
+                if len(block) == 0:
+                    break
+                end = block.rfind(b"\n") + 1
+                if end == 0 and len(block) < READ_BLOCK_SIZE:
+                    # The last row's still being written
+                    self.tail = parse_line(block)
+                    break
+                end = end or len(block)
+                self.add_rows(*parse_rows(block[:end]))
+                self.offset += end
+                f.seek(self.offset)
+
+    # Read the column labels and the first row, and skip ahead to the last history bytes of the file
+    #
+    # @return False if the first row isn't all there yet
+    def read_start(self, f, size, history):
+        f.readline()
+        first = f.readline()
+        row = parse_line(first)
+        if row is None:
+            return False
+        self.start = row[0]
+        if not first.endswith(b"\n"):
+            self.tail = row
+            return False
+        self.add_rows(np.array([row[0]]), np.array([row[1]]))
+        self.offset = f.tell()
+        if size - history > self.offset:
+            f.seek(size - history)
+            f.readline()
+            self.offset = f.tell()
+        return True
+
+    # Fold some new rows into the throughput
+    #
+    # The EWMA over the new rows is worked out in one go: each step between rows k-1 and k gets the weight
+    # 1 - exp(-dt_k / RATE_TIME_CONSTANT), and everything before it decays by exp(-dt / RATE_TIME_CONSTANT) for
+    # every (counted) wall second after it
+    def add_rows(self, wall, sim):
+        if len(wall) == 0:
+            return
+        # The wall clock only goes down to seconds, so only the last row of each second counts
+        last = np.append(wall[1:] != wall[:-1], True)
+        wall = wall[last]
+        sim = sim[last]
+        if self.wall is None:
+            self.wall = self.last_advance = wall[0]
+            self.sim = sim[0]
+
+        steps = np.diff(np.concatenate(([self.wall], wall)))
+        advances = np.diff(np.concatenate(([self.sim], sim)))
+        counted = (steps > 0) & (steps <= PAUSE_SECONDS) & (advances >= 0)
+        rates = np.divide(advances, steps, out=np.zeros(len(steps)), where=counted)
+        if self.rate is None and counted.any():
+            self.rate = rates[np.argmax(counted)]
+        if self.rate is not None:
+            decay = np.cumsum(np.where(counted, -steps / RATE_TIME_CONSTANT, 0.0))
+            weights = np.where(counted, -np.expm1(-steps / RATE_TIME_CONSTANT), 0.0)
+            self.rate = self.rate * np.exp(decay[-1]) + np.sum(weights * rates * np.exp(decay[-1] - decay))
+
+        moved = np.flatnonzero(advances > 0)
+        if len(moved) > 0:
+            self.last_advance = wall[moved[-1]]
+        self.wall = wall[-1]
+        self.sim = sim[-1]
+
+    # @return (wall seconds, simulated time) of the latest row, including one that's still being written
+    def get_latest(self):
+        if self.tail is not None and (self.wall is None or self.tail[0] >= self.wall):
+            return self.tail
+        return self.wall, self.sim
+
+    # @return (time of the latest row, time of the first row, simulated time reached), like
+    #         job.get_current_start_timestep_times()
+    def get_times(self):
+        if self.start is None:
+            raise ValueError("no rows in " + str(self.location) + " yet")
+        wall, sim = self.get_latest()
+        return to_datetime(wall), to_datetime(self.start), sim
+
+    # Work out how the run's doing, for a run that ends at duration seconds of simulated time
+    #
+    # now is the time (seconds since the epoch, like the mtime) to check for a stall against
+    #
+    # @return a timestep_estimate
+    def get_estimate(self, duration, now=None):
+        if now is None:
+            now = time.time()
+        wall, sim = self.get_latest()
+        remaining = None
+        end_time = None
+        if self.rate is not None and self.rate > 0:
+            remaining = timedelta(seconds=max(0.0, duration - sim) / self.rate)
+            end_time = to_datetime(wall) + remaining
+        stalled = ((self.mtime is not None and now - self.mtime > STALL_SECONDS) or
+                   (self.last_advance is not None and wall - self.last_advance > STALL_SECONDS))
+        return timestep_estimate(sim, self.rate, remaining, end_time, stalled)
+
+# ----------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Import general libraries
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+
+# ----------------------------------------------------------------------------------------------------------- #
+
+# Timing spans for every phase of a status refresh, so we can see where a slow refresh goes
+#
+# Wrap a phase in a span:
+#
+#   with tracing.span("timestep", directory=self.directory_name):
+#       ...
+#
+# When tracing is off (the default) span() hands back the same do-nothing object every time, so leaving
+# spans in the code costs next to nothing. Turn it on with enable(), then write() the spans out either as
+# a JSON summary (totals per phase, per worker, and the slowest individual spans) or as a Chrome trace you
+# can open in chrome://tracing or https://ui.perfetto.dev.
+#
+# With enable(profile=True) the code inside profiled() calls is also run under cProfile, and
+# write_profile() saves the combined stats from every thread and worker process.
+
+# Spans recorded so far, as (name, start in ns, duration in ns, pid, thread id, args) tuples
+events = list()
+
+# Combined cProfile stats, when profiling is on
+profile_stats = None
+
+enabled = False
+profiling = False
+lock = threading.Lock()
+
+# The do-nothing span we hand out when tracing is off
+class null_span:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = null_span()
+
+# A span that records how long the code inside it took
+class timed_span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter_ns()
+        events.append((self.name, self.start, end - self.start, os.getpid(), threading.get_ident(), self.args))
+        return False
+
+# @return a span for the phase called name, with any keyword arguments saved alongside it
+def span(name, **args):
+    if not enabled:
+        return NULL_SPAN
+    return timed_span(name, args)
+
+def enable(profile=False):
+    global enabled, profiling
+    enabled = True
+    profiling = profile
+
+def is_enabled():
+    return enabled
+
+# Forget everything recorded so far (e.g., between watch mode refreshes, or in a freshly forked worker)
+#
+# With profile=False the cProfile stats are kept, so they add up over every watch mode refresh
+def reset(profile=True):
+    global profile_stats
+    del events[:]
+    if profile:
+        profile_stats = None
+
+# Hand over everything recorded so far and forget it, so a worker process can send its spans back
+#
+# @return (list of span events, cProfile stats dict or None)
+def take():
+    global profile_stats
+    taken = (list(events), profile_stats.stats if profile_stats is not None else None)
+    reset()
+    return taken
+
+# Add spans and cProfile stats that came back from a worker process
+def merge(taken):
+    new_events, stats = taken
+    events.extend(new_events)
+    if stats is not None:
+        add_profile_stats(stats)
+
+# pstats.Stats.add() takes anything with create_stats() and a stats dict
+class raw_stats:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+def add_profile_stats(stats):
+    global profile_stats
+    with lock:
+        if profile_stats is None:
+            profile_stats = pstats.Stats(raw_stats(stats))
+        else:
+            profile_stats.add(raw_stats(stats))
+
+# Call method(*args, **kwargs), under cProfile if profiling is on
+#
+# cProfile only sees the thread it's started in, so every thread and worker process that does real work
+# runs it through here and we add up the stats
+def profiled(method, *args, **kwargs):
+    if not profiling:
+        return method(*args, **kwargs)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return method(*args, **kwargs)
+    finally:
+        profile.disable()
+        profile.create_stats()
+        add_profile_stats(profile.stats)
+
+# Add up every span by name, overall and per worker (process id : thread id)
+#
+# @return a dict ready to be written as JSON
+def summarize(slowest=25):
+    phases = dict()
+    workers = dict()
+    for name, start, duration, pid, tid, args in list(events):
+        for totals in (phases.setdefault(name, dict()),
+                       workers.setdefault(str(pid) + ":" + str(tid), dict()).setdefault(name, dict())):
+            totals["count"] = totals.get("count", 0) + 1
+            totals["total_s"] = totals.get("total_s", 0.0) + duration / 1e9
+            totals["max_s"] = max(totals.get("max_s", 0.0), duration / 1e9)
+    longest = sorted(events, key=lambda event: event[2], reverse=True)[:slowest]
+    return {"phases": phases,
+            "workers": workers,
+            "slowest": [{"name": name, "seconds": duration / 1e9, "args": args}
+                        for name, start, duration, pid, tid, args in longest]}
+
+# @return every span as a Chrome trace event ("X" = complete event, times in microseconds)
+def chrome_trace():
+    return {"traceEvents": [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+                             "pid": pid, "tid": tid, "args": {key: str(value) for key, value in args.items()}}
+                            for name, start, duration, pid, tid, args in list(events)],
+            "displayTimeUnit": "ms"}
+
+# Write the spans to location, as a "json" summary or a "chrome" trace
+def write(location, trace_format="json"):
+    try:
+        with open(location, 'w') as f:
+            if trace_format == "chrome":
+                json.dump(chrome_trace(), f)
+            else:
+                json.dump(summarize(), f, indent=2)
+    except Exception as e:
+        print("ERROR: could not write trace to " + location + ".\n\t" + repr(e))
+
+# Save the combined cProfile stats to location (read them with pstats or snakeviz) and print the top of them
+def write_profile(location, top=25):
+    if profile_stats is None:
+        return
+    try:
+        profile_stats.dump_stats(location)
+        profile_stats.sort_stats("cumulative").print_stats(top)
+    except Exception as e:
+        print("ERROR: could not write profile to " + location + ".\n\t" + repr(e))
+
+# ----------------------------------------------------------------------------------------------------------- #